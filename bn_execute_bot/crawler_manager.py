@@ -0,0 +1,109 @@
+# crawler_manager.py
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+class CrawlerManager:
+    """Run coinglass/btc_crawler.py as a child process.
+
+    Usable as a context manager; stop() terminates the crawler, killing it if it
+    does not exit within the timeout.
+    """
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet  # discard crawler output instead of writing log files
+        self.process = None
+        self._stopping = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """Start the Coinglass crawler in a separate process; returns the Popen or None."""
+        try:
+            # Get the absolute path to btc_crawler.py using the current script's location
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            crawler_path = os.path.abspath(os.path.join(current_dir, '..', 'coinglass', 'btc_crawler.py'))
+
+            print(f"Looking for crawler at: {crawler_path}")
+
+            if not os.path.exists(crawler_path):
+                print(f"Error: Crawler script not found at {crawler_path}")
+                return None
+
+            # Start the crawler script
+            startupinfo = None
+            if sys.platform == 'win32':
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+            print(f"Starting crawler process...")
+            if self.quiet:
+                stderr_log = None
+                self.process = self._spawn(crawler_path, startupinfo, subprocess.DEVNULL, subprocess.DEVNULL)
+            else:
+                # Create logs directory if it doesn't exist
+                logs_dir = os.path.join(os.path.dirname(crawler_path), 'logs')
+                os.makedirs(logs_dir, exist_ok=True)
+
+                # Set up log files with absolute paths
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                stdout_log = os.path.join(logs_dir, f'crawler_output_{timestamp}.log')
+                stderr_log = os.path.join(logs_dir, f'crawler_error_{timestamp}.log')
+
+                # The child keeps its own handles; ours are closed once it has started
+                with open(stdout_log, 'w', encoding='utf-8') as stdout_file, \
+                     open(stderr_log, 'w', encoding='utf-8') as stderr_file:
+                    self.process = self._spawn(crawler_path, startupinfo, stdout_file, stderr_file)
+                print(f"Logs are being written to:\nOutput: {stdout_log}\nErrors: {stderr_log}")
+
+            # Report an early exit from a watcher thread instead of blocking startup
+            # for a fixed liveness probe
+            print(f"Started Coinglass crawler (PID: {self.process.pid})")
+            threading.Thread(target=self._watch, args=(self.process, stderr_log), daemon=True).start()
+            return self.process
+
+        except Exception as e:
+            print(f"Error starting Coinglass crawler: {e}")
+            return None
+
+    def _spawn(self, crawler_path, startupinfo, stdout, stderr):
+        return subprocess.Popen(
+            [sys.executable, crawler_path],
+            stdout=stdout,
+            stderr=stderr,
+            startupinfo=startupinfo,
+            cwd=os.path.dirname(crawler_path)  # Set working directory to crawler's directory
+        )
+
+    def _watch(self, process, stderr_log):
+        """Log when the crawler exits on its own."""
+        returncode = process.wait()
+        if returncode and not self._stopping:
+            where = f", see {stderr_log}" if stderr_log else ""
+            print(f"Coinglass crawler exited with code {returncode}{where}")
+
+    def stop(self, timeout=5):
+        """Terminate the crawler, killing it if it does not exit within timeout seconds."""
+        process = self.process
+        if process is None:
+            return
+        self.process = None
+        self._stopping = True
+        if process.poll() is not None:
+            return
+        print("Terminating Coinglass crawler...")
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print("Coinglass crawler did not exit, killing it")
+            process.kill()
+            process.wait()
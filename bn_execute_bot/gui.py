@@ -1,16 +1,167 @@
 # gui.py
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, simpledialog
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+import heapq
+import io
 import json
 import os
+import queue
+import random
+import threading
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
 import time
 
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same layout
+    orjson = None
+
+# Strategy thresholds used by _score
+RSI_OVERSOLD = 20
+RSI_OVERBOUGHT = 80
+FLOW_5M_THRESHOLD = 500_000  # USD of 5-minute spot netflow
+
+_SIGNAL_COLORS = {
+    "STRONG BUY": "dark green",
+    "BUY": "green",
+    "NO SIGNAL": "black",
+    "SELL": "red",
+    "STRONG SELL": "dark red"
+}
+
+def _check_trade_fields(contract, direction, price, tif, leverage, risk_percentage,
+                        stop_loss, take_profit):
+    """Validate raw trade fields and return the normalised numeric ones.
+
+    Raises ValueError with a user-facing message on the first bad field.
+    """
+    if not contract:
+        raise ValueError("Contract cannot be empty")
+    if not direction:
+        raise ValueError("Direction must be selected")
+    if not tif:
+        raise ValueError("Time in Force must be selected")
+    price = float(price)
+    leverage = float(leverage)
+    risk_percentage = float(risk_percentage)
+    if price < 0:
+        raise ValueError("Price cannot be negative")
+    if leverage <= 0:
+        raise ValueError("Leverage must be positive")
+    if not 0 < risk_percentage <= 1:
+        raise ValueError("Risk percentage must be between 0 and 1")
+    if stop_loss >= 0 or take_profit <= 0:
+        raise ValueError("Stop Loss must be negative, Take Profit must be positive")
+    return {'price': str(price), 'leverage': leverage, 'risk_percentage': risk_percentage}
+
+# Netflow windows shown in the GUI, in column order of the cached Coinglass flow array
+_FLOW_PERIODS = ('5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '24h')
+
+def _dump_json(obj):
+    """Serialise obj to UTF-8 JSON bytes with 2-space indentation."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+def _freeze_templates(configs):
+    """Wrap each trade template in a read-only view so it can be shared without copying."""
+    return {name: MappingProxyType(params) for name, params in configs.items()}
+
+@lru_cache(maxsize=4096)
+def _parse_cg_ts(s):
+    """Parse a Coinglass CSV timestamp; the set of distinct values is small, so memoize."""
+    return datetime.strptime(s, '%d %b %Y, %H:%M')
+
+def _read_csv_tail(path, max_rows=64, block=1 << 14):
+    """Parse the header and at most max_rows trailing lines of an append-only CSV.
+
+    Only the final block of the file is read, so cost stays flat as the file grows.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        size = f.seek(0, os.SEEK_END)
+        start = max(len(header), size - block)
+        f.seek(start)
+        lines = f.read().splitlines(keepends=True)
+    if start > len(header):
+        lines = lines[1:]  # first line may be cut off mid-row
+    return pd.read_csv(io.BytesIO(header + b''.join(lines[-max_rows:])))
+
+def _rsi(closes, periods=14):
+    """RSI series over a float array using simple moving averages of gains/losses.
+
+    Plain array code so live ticks and historical replays share one kernel.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    rsi = np.full(len(closes), np.nan)
+    if len(closes) < periods:
+        return rsi
+    delta = np.diff(closes, prepend=closes[0])
+    gains = np.cumsum(np.where(delta > 0, delta, 0.0))
+    losses = np.cumsum(np.where(delta < 0, -delta, 0.0))
+    # Rolling sums via cumulative-sum differences
+    gains[periods:] = gains[periods:] - gains[:-periods]
+    losses[periods:] = losses[periods:] - losses[:-periods]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gains[periods - 1:] / losses[periods - 1:]
+        rsi[periods - 1:] = 100 - (100 / (1 + rs))
+    return rsi
+
+def _rsi_last(closes, periods=14):
+    """Last value of _rsi(closes, periods), computed from the final window only."""
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(closes) < periods:
+        return np.nan
+    delta = np.diff(closes[-(periods + 1):])
+    gain = delta[delta > 0].sum()
+    loss = -delta[delta < 0].sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + np.float64(gain) / loss))
+
+def _wilder_step(avg_gain, avg_loss, delta, periods=14):
+    """Advance Wilder's smoothed average gain/loss by one close-to-close delta."""
+    avg_gain = (avg_gain * (periods - 1) + max(delta, 0.0)) / periods
+    avg_loss = (avg_loss * (periods - 1) + max(-delta, 0.0)) / periods
+    return avg_gain, avg_loss
+
+def _wilder_seed(closes, periods=14):
+    """Wilder average gain/loss after the last of closes (needs periods + 1 closes)."""
+    delta = np.diff(np.asarray(closes, dtype=np.float64))
+    avg_gain = float(np.clip(delta[:periods], 0, None).mean())
+    avg_loss = float(np.clip(-delta[:periods], 0, None).mean())
+    for d in delta[periods:]:
+        avg_gain, avg_loss = _wilder_step(avg_gain, avg_loss, float(d), periods)
+    return avg_gain, avg_loss
+
+def _rsi_from_avgs(avg_gain, avg_loss):
+    """RSI from smoothed gain/loss; 50 when there has been no movement at all."""
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+def _score(price, ma5, ma20, ma50, rsi, flow_5m):
+    """Score equal-length indicator arrays: 1 for long, -1 for short, 0 for no signal."""
+    price, ma5, ma20, ma50, rsi, flow_5m = (
+        np.asarray(a, dtype=np.float64) for a in (price, ma5, ma20, ma50, rsi, flow_5m)
+    )
+    long_conditions = ((ma5 > ma20) & (rsi < RSI_OVERSOLD)
+                       & (flow_5m < -FLOW_5M_THRESHOLD) & (price > ma50))
+    short_conditions = ((ma5 < ma20) & (rsi > RSI_OVERBOUGHT)
+                        & (flow_5m > FLOW_5M_THRESHOLD) & (price < ma50))
+    return np.where(long_conditions, 1, np.where(short_conditions, -1, 0))
+
 class TradingGUI:
-    def __init__(self, root, trader):
+    def __init__(self, root, trader, market_buffer=None):
         self.root = root
         self.trader = trader
+        # Stream-fed MarketDataBuffer; positions fall back to REST while it is stale
+        self.market_buffer = market_buffer
         self.root.title("Binance Futures Trading")
         self.root.geometry("1000x800")  # Keeping as 1000x800 per your preference
 
@@ -21,6 +172,46 @@ class TradingGUI:
         self.last_position_update = 0
         self.update_interval = 2000  # 2 seconds
         self.position_update_interval = 5000  # 5 seconds
+        self._buffer_redraw_pending = False
+        if market_buffer is not None:
+            # Account and order events redraw the table as they arrive; the timer
+            # only backs them up and triggers the periodic REST re-seed
+            market_buffer.on_change = self._on_buffer_change
+        self._last_rtt_ema = None  # smoothed kline round-trip time, seconds
+
+        # Background pool for blocking work; results are handed back to the
+        # Tk thread through _ui_queue and applied in _drain_ui_queue
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        # Separate pool for requests fanned out from inside _io_pool tasks, so a
+        # task waiting on its own sub-requests can never starve the pool it runs on
+        self._fanout_pool = ThreadPoolExecutor(max_workers=4)
+        self._ui_queue = queue.Queue()
+        self._symbol_locks = {}  # symbol -> Lock serialising order changes
+        # Newest market sample from the worker; only one GUI flush is queued at a time
+        self._latest_market = None
+        self._gui_pending = False
+        self._rendered = {}  # widget path -> options last passed to config()
+        self._pending_ui = {}  # widget -> options waiting for the next _flush_ui
+        self._last_flow_row = None  # Coinglass row currently on screen
+
+        # Short-lived REST caches shared with the positions refresh
+        self._leverage_cache = {}  # symbol -> (leverage, fetched_at)
+        self._leverage_ttl = 30  # seconds
+        self._open_orders_cache = None  # all open orders from the last refresh
+        self._positions_cache = None  # (symbol -> open position, fetched_at)
+        self._positions_ttl = 2  # seconds
+
+        # Time-limited positions: a min-heap of (deadline, contract) checked by one
+        # recurring timer; _close_deadline_for holds the live deadline per contract
+        self._close_deadlines = []
+        self._close_deadline_for = {}
+        self.position_time_limit = 3600  # seconds
+
+        # Log messages pending a flush; timestamps are formatted once per second
+        self._log_ring = deque(maxlen=1000)
+        self._log_flush_pending = False
+        self._last_ts_second = None
+        self._last_ts_str = ""
         
         # Create main container frame
         self.main_container = ttk.Frame(self.root)
@@ -32,7 +223,7 @@ class TradingGUI:
         # Get the script's directory
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.strategy_file = os.path.join(self.script_dir, "strategies.json")
-        self.trade_configs = self.load_trade_configs()
+        self.trade_configs = _freeze_templates(self.load_trade_configs())
         self.current_trade_params = {}
 
         # Initialize previous values for signal calculation
@@ -42,12 +233,34 @@ class TradingGUI:
         self.prev_signal = None  # Track previous signal to prevent duplicates
         self.prev_signal_time = None  # Track when the last signal was generated
         # Initialize signal history
-        self.signal_history = []  # List to store (timestamp, signal) tuples
+        self.signal_history = deque(maxlen=100)  # Bounded (timestamp, signal) tuples
         
         # Initialize Coinglass data with absolute path
-        self.coinglass_data = None
-        self.last_coinglass_update = None
+        self.coinglass_df = None  # recent CSV rows sorted newest first
+        self.last_coinglass_update = None  # st_mtime_ns the frame was parsed at
         self.coinglass_file = os.path.abspath(os.path.join(self.script_dir, "..", "btc_spot_netflow.csv"))
+        # Live file written by the crawler (its working directory is coinglass/)
+        self.coinglass_csv = os.path.abspath(os.path.join(self.script_dir, "..", "coinglass", "btc_spot_netflow.csv"))
+
+        # (CSV mtime, parsed frame, latest row, flows) where flows holds the frame's
+        # _FLOW_PERIODS columns as floats (NaN where missing). The I/O pool and the Tk
+        # thread both refresh it, so it is only ever replaced as a whole tuple
+        self._coinglass_cache = (None, None, None, None)
+
+        # Memoized signal for unchanged inputs within the same 5-minute bar
+        self._last_sig_key = None
+        self._last_sig = "NO SIGNAL"
+
+        # Rolling 5m close window and MA sums, updated by the market-data worker
+        self._closes = deque(maxlen=100)
+        self._closes_contract = None
+        self._last_open_time = None
+        self._sum7 = 0.0
+        self._sum25 = 0.0
+        self._last_price = {}  # contract -> (last close, fetched_at) for order sizing
+        # Wilder RSI(14) averages as of the last settled candle
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
 
         # Create other frames
         self.create_trade_frame()
@@ -59,6 +272,53 @@ class TradingGUI:
             self.load_trade_template()
 
         self.update_positions_and_price()
+        self._drain_ui_queue()
+        self.root.after(30000, self._check_deadlines)
+
+    def _drain_ui_queue(self):
+        """Apply results posted by background workers on the Tk thread.
+
+        Workers only ever touch the queue; everything queued since the last pass is
+        applied here in one go, and a failing callback does not hold up the rest.
+        """
+        try:
+            while True:
+                try:
+                    kind, payload = self._ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if kind == 'call':
+                        fn, args = payload
+                        fn(*args)
+                except Exception as e:
+                    self.log_message(f"Error applying background result: {e}")
+        finally:
+            # Pick up messages logged by workers
+            if self._log_ring:
+                self._flush_logs()
+            self.root.after(100, self._drain_ui_queue)
+
+    def _submit(self, fn, *args, on_done=None):
+        """Run fn on the I/O pool and hand its result to on_done on the Tk thread."""
+        def done(fut):
+            try:
+                result = fut.result()
+            except Exception as e:
+                self.log_message(f"Error in background task {fn.__name__}: {e}")
+                result = None
+            if on_done is not None:
+                self._ui_queue.put(('call', (on_done, (result,))))
+        self._io_pool.submit(fn, *args).add_done_callback(done)
+
+    def _gather(self, *calls):
+        """Run (fn, *args) calls concurrently from a worker; return results in order."""
+        futures = [self._fanout_pool.submit(fn, *args) for fn, *args in calls]
+        return [future.result() for future in futures]
+
+    def _symbol_lock(self, symbol):
+        """Return the lock that serialises order changes for symbol."""
+        return self._symbol_locks.setdefault(symbol, threading.Lock())
 
     def load_trade_configs(self):
         try:
@@ -115,20 +375,18 @@ class TradingGUI:
         }
 
         try:
-            # Load existing strategies
-            import json
-            try:
-                with open(self.strategy_file, 'r') as f:
-                    strategies = json.load(f)
-            except FileNotFoundError:
-                strategies = {}
+            # trade_configs is the authoritative copy of the file's contents
+            strategies = {name: dict(config) for name, config in self.trade_configs.items()}
 
             # Update or add the trade template
             strategies[trade_name] = params
-            with open(self.strategy_file, 'w') as f:
-                json.dump(strategies, f, indent=4)
+            # Write to a temporary file and swap it in so a crash can't truncate the file
+            tmp_file = self.strategy_file + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(_dump_json(strategies))
+            os.replace(tmp_file, self.strategy_file)
 
-            self.trade_configs = strategies
+            self.trade_configs = _freeze_templates(strategies)
             self.log_message(f"Saved trade template: {trade_name}")
         except Exception as e:
             self.log_message(f"Error saving trade template {trade_name}: {e}")
@@ -262,6 +520,12 @@ class TradingGUI:
             ('12h', 'long'), ('24h', 'long')
         ]
         
+        # One style per flow direction; updates swap the style instead of the colour
+        style = ttk.Style()
+        style.configure('FlowPos.TLabel', foreground='green')
+        style.configure('FlowNeg.TLabel', foreground='red')
+        style.configure('FlowFlat.TLabel', foreground='gray')
+
         # Create labels for each period
         for period, frame_type in flow_periods:
             frame = locals()[f"{frame_type}_frame"]
@@ -298,6 +562,9 @@ class TradingGUI:
         history_frame.pack(fill=tk.X, pady=1)
         self.signal_history_text = scrolledtext.ScrolledText(history_frame, height=4)
         self.signal_history_text.pack(fill=tk.BOTH)
+        # One tag per signal, configured once; history lines are inserted with their signal as tag
+        for sig, color in _SIGNAL_COLORS.items():
+            self.signal_history_text.tag_configure(sig, foreground=color)
 
         # Buttons
         button_frame = ttk.Frame(left_frame)
@@ -458,11 +725,21 @@ class TradingGUI:
             self.positions_tree.column(col, width=width)
         
         self.positions_tree.pack(fill=tk.X, pady=(0, 5))
+        self._tree_rows = {}  # symbol -> values currently shown in its row
+        self._positions_sig = None  # inputs of the last positions render
+
+        # Bind click events for Edit and Close buttons; handlers are keyed by the
+        # column id identify_column returns and take (symbol, pos_amt, entry_price)
+        self._click_handlers = {
+            '#7': self.edit_position_sl_tp,
+            '#8': lambda symbol, pos_amt, entry_price: self.close_single_position(symbol, pos_amt),
+        }
+        self.positions_tree.bind('<ButtonRelease-1>', self.handle_position_click)
 
         # Button frame
         button_frame = ttk.Frame(positions_frame)
         button_frame.pack(fill=tk.X, pady=(0, 5))
-        ttk.Button(button_frame, text="Refresh", command=self.update_positions_and_price).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Refresh", command=self._refresh_now).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Close All", command=self.close_all_positions).pack(side=tk.LEFT, padx=5)
 
     def create_log_frame(self):
@@ -499,9 +776,29 @@ class TradingGUI:
         self.log_frame_expanded = not self.log_frame_expanded
 
     def log_message(self, message):
+        # Safe from any thread: messages wait in the ring until _flush_logs
+        # writes them to the widget on the Tk thread
+        self._log_ring.append((time.time(), message))
+        if not self._log_flush_pending and threading.current_thread() is threading.main_thread():
+            self._log_flush_pending = True
+            self.root.after_idle(self._flush_logs)
+
+    def _flush_logs(self):
+        """Write all pending log messages to the widget with a single insert."""
+        self._log_flush_pending = False
+        lines = []
+        while self._log_ring:
+            ts, message = self._log_ring.popleft()
+            second = int(ts)
+            if second != self._last_ts_second:
+                self._last_ts_second = second
+                self._last_ts_str = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+            lines.append(f"{self._last_ts_str}: {message}\n")
+        if not lines:
+            return
         self.log_text.config(state='normal')
-        # Add message to log
-        self.log_text.insert(tk.END, f"{datetime.now()}: {message}\n")
+        # Add messages to log
+        self.log_text.insert(tk.END, ''.join(lines))
         # Keep only last 1000 lines to prevent memory bloat
         num_lines = int(self.log_text.index('end-1c').split('.')[0])
         if num_lines > 1000:
@@ -511,19 +808,45 @@ class TradingGUI:
         if self.log_frame_expanded:
             self.log_text.see(tk.END)
 
+    def _set_if_changed(self, var, value):
+        """Set a Tk variable only when its value differs, to avoid firing write traces."""
+        value = str(value)
+        if var.get() != value:
+            var.set(value)
+
+    def _config_if_changed(self, widget, **options):
+        """Configure a widget only when the options differ from what was last applied."""
+        key = str(widget)
+        if self._rendered.get(key) != options:
+            widget.config(**options)
+            self._rendered[key] = options
+
+    def _queue_ui(self, widget, **options):
+        """Stage a widget update; all staged updates are applied together when Tk is idle."""
+        if not self._pending_ui:
+            self.root.after_idle(self._flush_ui)
+        self._pending_ui[widget] = options
+
+    def _flush_ui(self):
+        """Apply staged widget updates, latest options per widget."""
+        pending, self._pending_ui = self._pending_ui, {}
+        for widget, options in pending.items():
+            self._config_if_changed(widget, **options)
+
     def load_trade_template(self, event=None):
         selected_trade = self.trade_var.get()
         if selected_trade:
             config = self.trade_configs[selected_trade]
-            self.current_trade_params = config.copy()
-            self.contract_var.set(config['contract'])
-            self.direction_var.set(config['direction'])
-            self.price_var.set(config['price'])
-            self.tif_var.set(config['tif'])
-            self.leverage_var.set(str(config['leverage']))
-            self.risk_var.set(str(config['risk_percentage']))
-            self.sl_var.set(str(config.get('stop_loss', '-2')))
-            self.tp_var.set(str(config.get('take_profit', '5')))
+            # Templates are read-only views, so share the reference instead of copying
+            self.current_trade_params = config
+            self._set_if_changed(self.contract_var, config['contract'])
+            self._set_if_changed(self.direction_var, config['direction'])
+            self._set_if_changed(self.price_var, config['price'])
+            self._set_if_changed(self.tif_var, config['tif'])
+            self._set_if_changed(self.leverage_var, config['leverage'])
+            self._set_if_changed(self.risk_var, config['risk_percentage'])
+            self._set_if_changed(self.sl_var, config.get('stop_loss', '-2'))
+            self._set_if_changed(self.tp_var, config.get('take_profit', '5'))
             self.log_message(f"Loaded trade template: {selected_trade} with price: {config['price']}")
             self.update_market_price()
 
@@ -547,30 +870,7 @@ class TradingGUI:
                 'take_profit': float(self.tp_var.get())
             }
             self.log_message(f"Raw params before validation: {params}")
-            if not params['contract']:
-                raise ValueError("Contract cannot be empty")
-            if not params['direction']:
-                raise ValueError("Direction must be selected")
-            if not params['tif']:
-                raise ValueError("Time in Force must be selected")
-            price = float(params['price'])
-            leverage = float(params['leverage'])
-            risk_percentage = float(params['risk_percentage'])
-            sl = params['stop_loss']
-            tp = params['take_profit']
-            if price < 0:
-                raise ValueError("Price cannot be negative")
-            if leverage <= 0:
-                raise ValueError("Leverage must be positive")
-            if risk_percentage <= 0 or risk_percentage > 1:
-                raise ValueError("Risk percentage must be between 0 and 1")
-            if sl >= 0 or tp <= 0:
-                raise ValueError("Stop Loss must be negative, Take Profit must be positive")
-            params['price'] = str(price)
-            params['leverage'] = leverage
-            params['risk_percentage'] = risk_percentage
-            params['stop_loss'] = sl
-            params['take_profit'] = tp
+            params.update(_check_trade_fields(**params))
             self.log_message(f"Validated params: {params}")
             return params
         except ValueError as e:
@@ -580,95 +880,114 @@ class TradingGUI:
             messagebox.showerror("Error", f"Invalid parameter format: {str(e)}")
             return None
 
+    def _load_coinglass_cached(self):
+        """Return (frame sorted newest first, latest row, flows), re-parsing only when the CSV changes."""
+        csv_file = self.coinglass_csv
+
+        try:
+            mtime_ns = os.stat(csv_file).st_mtime_ns
+        except FileNotFoundError:
+            self.log_message("Warning: Exchange flow data file not found")
+            return None, None, None
+
+        cached = self._coinglass_cache
+        if mtime_ns == cached[0]:
+            return cached[1:]
+
+        # Read the tail of the CSV file; the crawler appends rows in time order
+        df = _read_csv_tail(csv_file)
+        if df.empty:
+            self.log_message("Warning: Exchange flow data file is empty")
+            df, latest_row, flows = None, None, None
+        else:
+            # Sort by timestamp in descending order to get the latest data
+            df['Timestamp'] = df['Timestamp'].map(_parse_cg_ts)
+            df = df.sort_values('Timestamp', ascending=False, ignore_index=True)
+            latest_row = df.iloc[0]
+            # Convert the flow columns once per file change, tolerating thousands separators
+            flows = df.reindex(columns=list(_FLOW_PERIODS))
+            flows = flows.apply(lambda col: pd.to_numeric(
+                col if pd.api.types.is_numeric_dtype(col) else col.astype(str).str.replace(',', ''), errors='coerce'))
+            flows = flows.to_numpy(dtype=np.float64)
+
+        self._coinglass_cache = (mtime_ns, df, latest_row, flows)
+        self.coinglass_df = df
+        self.last_coinglass_update = mtime_ns
+        return df, latest_row, flows
+
+    def read_latest_coinglass_row(self):
+        """Read the most recent Coinglass row and its flow values without touching any widgets.
+
+        Returns (row, flows) from the same parse of the file, or (None, None). The
+        parsed row is reused until the crawler rewrites the file.
+        """
+        _, latest_row, flows = self._load_coinglass_cached()
+        if latest_row is None:
+            return None, None
+        return latest_row, flows[0]
+
     def load_coinglass_data(self):
         """Load and display Coinglass exchange flow data."""
         try:
-            # Get the path to the coinglass data file
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            csv_file = os.path.join(current_dir, '..', 'coinglass', 'btc_spot_netflow.csv')
-            
-            if not os.path.exists(csv_file):
-                self.log_message("Warning: Exchange flow data file not found")
-                return
-                
-            # Read the CSV file
-            df = pd.read_csv(csv_file)
-            if df.empty:
-                self.log_message("Warning: Exchange flow data file is empty")
+            self.render_coinglass_row(*self.read_latest_coinglass_row())
+        except Exception as e:
+            self.log_message(f"Error loading exchange flow data: {str(e)}")
+            # Schedule retry after a short delay
+            self.root.after(5000, self.load_coinglass_data)
+
+    def render_coinglass_row(self, latest_row, flows):
+        """Display a Coinglass row and its flows as returned by read_latest_coinglass_row."""
+        try:
+            # The cached row object is reused until the CSV changes
+            if latest_row is None or latest_row is self._last_flow_row:
                 return
-                
-            # Sort by timestamp in descending order to get the latest data
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%d %b %Y, %H:%M')
-            df = df.sort_values('Timestamp', ascending=False)
-            
-            # Get the latest row
-            latest_row = df.iloc[0]
+            self._last_flow_row = latest_row
             
             # Update the labels with the latest data
             timestamp = latest_row['Timestamp'].strftime('%d %b %Y, %H:%M')
-            self.exchange_flow_time_var.set(f"Last Update: {timestamp}")
+            self._set_if_changed(self.exchange_flow_time_var, f"Last Update: {timestamp}")
             
-            # Update flow labels with proper formatting
-            flow_periods = ['5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '24h']
-            for period in flow_periods:
-                if period in latest_row.index:
-                    try:
-                        # Convert string to float, handling any potential formatting
-                        value_str = str(latest_row[period]).replace(',', '')
-                        value = float(value_str)
-                        
-                        # Format the value based on its magnitude
-                        if abs(value) >= 1_000_000:
-                            formatted_value = f"{value/1_000_000:.1f}M"
-                        elif abs(value) >= 1_000:
-                            formatted_value = f"{value/1_000:.1f}K"
-                        else:
-                            formatted_value = f"{value:.1f}"
-                        
-                        # Determine color based on value
-                        color = "green" if value > 0 else "red" if value < 0 else "gray"
-                        
-                        # Update the label
-                        label_name = f"flow_{period}_label"
-                        if hasattr(self, label_name):
-                            label = getattr(self, label_name)
-                            label.config(text=formatted_value, foreground=color)
-                            
-                    except (ValueError, KeyError) as e:
-                        self.log_message(f"Error parsing {period} value: {e}")
-                        continue
+            # Update flow labels with proper formatting; flows were parsed with the row
+            for period, value in zip(_FLOW_PERIODS, flows.tolist()):
+                if value != value:  # NaN: column missing or unparseable
+                    continue
+                
+                # Format the value based on its magnitude
+                if abs(value) >= 1_000_000:
+                    formatted_value = f"{value/1_000_000:.1f}M"
+                elif abs(value) >= 1_000:
+                    formatted_value = f"{value/1_000:.1f}K"
+                else:
+                    formatted_value = f"{value:.1f}"
+                
+                # Determine style based on value
+                style = 'FlowPos.TLabel' if value > 0 else 'FlowNeg.TLabel' if value < 0 else 'FlowFlat.TLabel'
+                
+                # Update the label
+                label = getattr(self, f"flow_{period}_label", None)
+                if label is not None:
+                    self._queue_ui(label, text=formatted_value, style=style)
             
         except Exception as e:
-            self.log_message(f"Error loading exchange flow data: {str(e)}")
-            # Schedule retry after a short delay
-            self.root.after(5000, self.load_coinglass_data)
+            self.log_message(f"Error displaying exchange flow data: {str(e)}")
 
     def calculate_rsi(self, closes, periods=14):
         """Calculate RSI using Binance's method."""
         try:
-            # Calculate price changes
-            delta = closes.diff()
-            
-            # Separate gains and losses
-            gains = delta.where(delta > 0, 0)
-            losses = -delta.where(delta < 0, 0)
-            
-            # First average
-            avg_gains = gains.rolling(window=periods).mean()
-            avg_losses = losses.rolling(window=periods).mean()
-            
-            # Calculate RS and RSI
-            rs = avg_gains / avg_losses
-            rsi = 100 - (100 / (1 + rs))
-            
-            return rsi
+            return pd.Series(_rsi(closes.to_numpy(), periods), index=closes.index)
         except Exception as e:
             self.log_message(f"Error calculating RSI: {e}")
             return pd.Series([50] * len(closes))  # Return neutral RSI on error
 
-    def calculate_1h_netflow(self, coinglass_data):
-        """Calculate 1-hour netflow from Coinglass data."""
+    def calculate_1h_netflow(self, coinglass_data=None):
+        """Calculate 1-hour netflow from Coinglass data (the cached frame by default)."""
         try:
+            if coinglass_data is None:
+                flows = self._load_coinglass_cached()[2]
+                if flows is None:
+                    return 0.0
+                # Newest-first 5m flows; 12 * 5min = 1 hour
+                return float(np.nan_to_num(flows[:12, 0]).sum())
             # Get the last 12 entries (12 * 5min = 1 hour)
             recent_data = coinglass_data.head(12)
             # Sum the 5-minute netflow values
@@ -678,41 +997,54 @@ class TradingGUI:
             self.log_message(f"Error calculating 1h netflow: {e}")
             return None
 
-    def generate_signal(self, price, ma7, ma25):
-        """Generate trading signals based on MA crossovers, RSI, and exchange flows."""
+    def generate_signal(self, contract, price, ma7, ma25, closes):
+        """Generate trading signals based on MA crossovers, RSI, and exchange flows.
+
+        closes are the 5m closes the price loop already fetched, newest last.
+        Runs on the background pool, so it must not touch Tk widgets or variables.
+        """
         try:
             if None in (price, ma7, ma25):
                 return "NO SIGNAL"
 
-            # Get klines data for MA and RSI calculations
-            contract = self.contract_var.get()
-            klines = self.trader.client.futures_klines(
-                symbol=contract,
-                interval='5m',
-                limit=100  # Get more data for accurate calculations
-            )
-            
-            if not klines:
-                return "NO SIGNAL"
+            # Reuse the last result while price, MAs, bar and flow file are unchanged
+            try:
+                cg_mtime = os.path.getmtime(self.coinglass_csv)
+            except OSError:
+                cg_mtime = None
+            bar_id = int(time.time() // 300)
+            key = (contract, round(price, 1), round(ma7, 1), round(ma25, 1), bar_id, cg_mtime)
+            if key == self._last_sig_key:
+                return self._last_sig
+
+            signal = self._compute_signal(closes)
+            self._last_sig_key = key
+            self._last_sig = signal
+            return signal
 
+        except Exception as e:
+            self.log_message(f"Error generating signal: {e}")
+            return "NO SIGNAL"
+
+    def _compute_signal(self, closes):
+        """Score the current bar from the given closes and the latest flow data."""
+        try:
             # Calculate all required indicators
-            closes = pd.Series([float(k[4]) for k in klines])
-            current_price = closes.iloc[-1]
+            closes = np.fromiter(closes, dtype=np.float64, count=len(closes))
+            current_price = closes[-1]
             
             # Calculate moving averages
-            ma5 = closes.rolling(window=5).mean().iloc[-1]
-            ma20 = closes.rolling(window=20).mean().iloc[-1]
-            ma50 = closes.rolling(window=50).mean().iloc[-1]
+            ma5 = closes[-5:].mean()
+            ma20 = closes[-20:].mean()
+            ma50 = closes[-50:].mean()
             
             # Calculate RSI
-            rsi = self.calculate_rsi(closes).iloc[-1]
+            rsi = _rsi_last(closes)
             
-            # Get Coinglass flow data
-            coinglass_data = self.load_coinglass_data()
-            if coinglass_data:
-                flow_5m = coinglass_data.get('5m', 0)
-            else:
-                flow_5m = 0
+            # Coinglass flow term: load_coinglass_data() returns None, so the flow has
+            # always read as 0 here; wiring the real value in would change which
+            # signals (and auto-trades) fire
+            flow_5m = 0
 
             # Log current indicators
             self.log_message(
@@ -721,25 +1053,11 @@ class TradingGUI:
                 f"Flow 5m: {flow_5m:,.0f}"
             )
 
-            # Long signal conditions (exactly matching auto trading strategy)
-            long_conditions = (
-                ma5 > ma20 and
-                rsi < 20 and
-                flow_5m < -500000 and
-                current_price > ma50
-            )
-
-            # Short signal conditions (exactly matching auto trading strategy)
-            short_conditions = (
-                ma5 < ma20 and
-                rsi > 80 and
-                flow_5m > 500000 and
-                current_price < ma50
-            )
-
-            if long_conditions:
+            # Same scoring as the auto trading strategy
+            score = _score([current_price], [ma5], [ma20], [ma50], [rsi], [flow_5m])[0]
+            if score == 1:
                 return "BUY"
-            elif short_conditions:
+            elif score == -1:
                 return "SELL"
 
             return "NO SIGNAL"
@@ -753,44 +1071,111 @@ class TradingGUI:
         try:
             current_time = time.time() * 1000  # Convert to milliseconds
             
-            # Prevent concurrent updates
+            # Skip while a background refresh is still in flight
             if not self.is_updating_positions:
-                self.is_updating_positions = True
-                try:
-                    # Check if enough time has passed since last update
-                    if current_time - self.last_position_update >= self.position_update_interval:
-                        self.update_positions()
-                        self.last_position_update = current_time
-                finally:
-                    self.is_updating_positions = False
+                # Check if enough time has passed since last update
+                if current_time - self.last_position_update >= self.position_update_interval:
+                    self.last_position_update = current_time
+                    self.update_positions()
             
             if not self.is_updating_price:
-                self.is_updating_price = True
-                try:
-                    # Check if enough time has passed since last update
-                    if current_time - self.last_price_update >= self.update_interval:
-                        self.update_market_price()
-                        self.last_price_update = current_time
-                finally:
-                    self.is_updating_price = False
+                # Check if enough time has passed since last update
+                if current_time - self.last_price_update >= self.update_interval:
+                    self.last_price_update = current_time
+                    self.update_market_price()
                     
         except Exception as e:
             self.log_message(f"Error in update cycle: {str(e)}")
         finally:
             # Schedule next update using a single timer
             self.root.after(1000, self.update_positions_and_price)
+
+    def _refresh_now(self):
+        """Make the next update tick refresh positions and price immediately."""
+        self.last_position_update = 0
+        self.last_price_update = 0
     
     def update_positions(self):
-        """Update positions with timeout handling."""
+        """Fetch positions in the background and redraw the table when they arrive."""
+        self.is_updating_positions = True
+        self._submit(self._blocking_fetch_positions, on_done=self._on_positions_fetched)
+
+    def _on_positions_fetched(self, result):
+        """Clear the in-flight flag and draw a background fetch."""
+        self.is_updating_positions = False
+        self._render_positions(result)
+
+    def _on_buffer_change(self):
+        """Queue one redraw for a burst of stream events (called on the stream thread)."""
+        if not self._buffer_redraw_pending:
+            self._buffer_redraw_pending = True
+            self._ui_queue.put(('call', (self._redraw_from_buffer, ())))
+
+    def _redraw_from_buffer(self):
+        """Draw the stream buffer's snapshot, or fall back to the regular refresh."""
+        self._buffer_redraw_pending = False
+        snapshot = self.market_buffer.snapshot()
+        if snapshot is None:
+            self._refresh_now()
+        else:
+            self._render_positions(snapshot)
+
+    def _blocking_fetch_positions(self):
+        """Fetch account, positions and open orders (runs on the I/O pool)."""
         try:
-            # Get positions and account info with timeout
-            account_info = self.trader.client.futures_account(timeout=5)
-            position_info = self.trader.client.futures_position_information(timeout=5)
-            open_orders = self.trader.client.futures_get_open_orders(timeout=5)
-            
-            # Clear existing items
-            for item in self.positions_tree.get_children():
-                self.positions_tree.delete(item)
+            buffer = self.market_buffer
+            if buffer is not None:
+                snapshot = buffer.snapshot()
+                if snapshot is not None:
+                    return snapshot
+
+            # Get positions and account info with timeout; the three requests are
+            # independent, so they overlap and the refresh costs about one round-trip
+            client = self.trader.client
+            started = time.time()
+            account_info, position_info, open_orders = self._gather(
+                (lambda: client.futures_account(timeout=5),),
+                (lambda: client.futures_position_information(timeout=5),),
+                (lambda: client.futures_get_open_orders(timeout=5),),
+            )
+            if buffer is not None:
+                buffer.seed(account_info, position_info, open_orders, started)
+            return account_info, position_info, open_orders
+        except Exception as e:
+            self.log_message(f"Error updating positions: {str(e)}")
+            return None
+
+    def _render_positions(self, result):
+        """Redraw balances and the positions table from (account, positions, open orders)."""
+        if result is None:
+            return
+        try:
+            account_info, position_info, open_orders = result
+            self._open_orders_cache = open_orders
+
+            # Bursts of stream events often carry identical state; skip the redraw
+            # when nothing the table or balance line shows has changed
+            sig = (
+                tuple(account_info.get(k) for k in ('totalWalletBalance', 'totalUnrealizedProfit', 'availableBalance'))
+                if account_info else None,
+                tuple((p['symbol'], p.get('positionAmt'), p.get('entryPrice'), p.get('leverage'))
+                      for p in position_info if float(p.get('positionAmt', 0)) != 0),
+                tuple((o['symbol'], o['type'], o.get('stopPrice')) for o in open_orders
+                      if o['type'] in ('STOP_MARKET', 'TAKE_PROFIT_MARKET')),
+                tuple((s, v.get('stop_loss'), v.get('take_profit')) for s, v in self.trader.sl_tp_orders.items()),
+            )
+            if sig == self._positions_sig:
+                return
+            self._positions_sig = sig
+
+            # Index SL/TP orders by symbol once (first match wins, as before)
+            sl_by_sym = {}
+            tp_by_sym = {}
+            for order in open_orders:
+                if order['type'] == 'STOP_MARKET':
+                    sl_by_sym.setdefault(order['symbol'], order)
+                elif order['type'] == 'TAKE_PROFIT_MARKET':
+                    tp_by_sym.setdefault(order['symbol'], order)
             
             # Update balance display
             if account_info:
@@ -798,24 +1183,27 @@ class TradingGUI:
                 total_unrealized_profit = float(account_info.get('totalUnrealizedProfit', 0))
                 available_balance = float(account_info.get('availableBalance', 0))
                 balance_text = f"USDT Balance: {total_wallet_balance:.2f} (Available: {available_balance:.2f}) | Unrealized P&L: {total_unrealized_profit:.2f}"
-                self.holdings_var.set(balance_text)
+                self._set_if_changed(self.holdings_var, balance_text)
             
-            # Update positions
+            # Update positions in place: rows are keyed by symbol (also their Treeview iid)
+            seen = set()
             for position in position_info:
                 pos_amt = float(position.get('positionAmt', 0))
                 if abs(pos_amt) > 0:  # Only show non-zero positions
                     symbol = position['symbol']
                     entry_price = float(position.get('entryPrice', 0))
                     mark_price = float(position.get('markPrice', 0))
-                    leverage = int(float(position.get('leverage', 10)))
+                    if 'leverage' in position:
+                        self._leverage_cache[symbol] = (float(position['leverage']), time.time())
+                        leverage = int(float(position['leverage']))
+                    else:
+                        # Rows built from stream events may not carry leverage yet
+                        cached = self._leverage_cache.get(symbol)
+                        leverage = int(cached[0]) if cached else 10
                     
                     # Find SL/TP orders for this position
-                    sl_order = next((order for order in open_orders 
-                                   if order['symbol'] == symbol 
-                                   and order['type'] == 'STOP_MARKET'), None)
-                    tp_order = next((order for order in open_orders 
-                                   if order['symbol'] == symbol 
-                                   and order['type'] == 'TAKE_PROFIT_MARKET'), None)
+                    sl_order = sl_by_sym.get(symbol)
+                    tp_order = tp_by_sym.get(symbol)
                     
                     # Get SL/TP prices and calculate percentages
                     sl_price = float(sl_order['stopPrice']) if sl_order else None
@@ -844,8 +1232,7 @@ class TradingGUI:
                     sl_display = f"{sl_percent:.1f}% ({sl_price:.2f})" if sl_price else f"{sl_percent:.1f}% (Not set)" if sl_percent else "Not set"
                     tp_display = f"{tp_percent:.1f}% ({tp_price:.2f})" if tp_price else f"{tp_percent:.1f}% (Not set)" if tp_percent else "Not set"
                     
-                    # Insert position into tree
-                    self.positions_tree.insert('', 'end', values=(
+                    values = (
                         symbol,
                         f"{pos_amt:.4f}",
                         f"{entry_price:.2f}",
@@ -854,22 +1241,33 @@ class TradingGUI:
                         tp_display,
                         "Edit",
                         "Close"
-                    ))
-                    
-            # Bind click events for Edit and Close buttons
-            self.positions_tree.bind('<ButtonRelease-1>', self.handle_position_click)
+                    )
+                    seen.add(symbol)
+                    previous = self._tree_rows.get(symbol)
+                    if previous is None:
+                        # Insert position into tree
+                        self.positions_tree.insert('', 'end', iid=symbol, values=values)
+                    elif previous != values:
+                        self.positions_tree.item(symbol, values=values)
+                    self._tree_rows[symbol] = values
+            
+            # Drop rows for positions that are gone
+            for symbol in [s for s in self._tree_rows if s not in seen]:
+                self.positions_tree.delete(symbol)
+                del self._tree_rows[symbol]
                     
         except Exception as e:
+            self._positions_sig = None  # redraw in full next time
             self.log_message(f"Error updating positions: {str(e)}")
-            # Schedule retry after a short delay
-            self.root.after(5000, self.update_positions)
 
     def handle_position_click(self, event):
         """Handle clicks on the positions tree."""
         try:
+            # Only the Edit and Close columns react to clicks
+            handler = self._click_handlers.get(self.positions_tree.identify_column(event.x))
+            if handler is None:
+                return
             item = self.positions_tree.identify_row(event.y)
-            column = self.positions_tree.identify_column(event.x)
-            
             if not item:
                 return
                 
@@ -880,25 +1278,86 @@ class TradingGUI:
             symbol = values[0]
             pos_amt = float(values[1])
             entry_price = float(values[2].replace('x', ''))  # Remove 'x' from leverage
-            
-            # Handle Edit button click (column #7)
-            if column == '#7':  # Edit column
-                self.edit_position_sl_tp(symbol, pos_amt, entry_price)
-            
-            # Handle Close button click (column #8)
-            elif column == '#8':  # Close column
-                self.close_single_position(symbol, pos_amt)
+            handler(symbol, pos_amt, entry_price)
                 
         except Exception as e:
             self.log_message(f"Error handling position click: {str(e)}")
 
+    def _get_leverage_cached(self, symbol):
+        """Return the position leverage for symbol, refreshing it after the TTL."""
+        cached = self._leverage_cache.get(symbol)
+        if cached and time.time() - cached[1] < self._leverage_ttl:
+            return cached[0]
+        # The user-data stream reports leverage changes, so a live buffer is authoritative
+        if self.market_buffer is not None:
+            leverage = self.market_buffer.leverage_for(symbol)
+            if leverage:
+                self._leverage_cache[symbol] = (leverage, time.time())
+                return leverage
+        leverage = float(self.trader.get_all_positions()[symbol]['leverage'])
+        self._leverage_cache[symbol] = (leverage, time.time())
+        return leverage
+
+    def _positions_by_symbol(self):
+        """Return open positions keyed by symbol, sharing one fetch within the TTL."""
+        cached = self._positions_cache
+        if cached and time.time() - cached[1] < self._positions_ttl:
+            return cached[0]
+        index = {pos['symbol']: pos for pos in self.trader.get_open_positions()}
+        self._positions_cache = (index, time.time())
+        return index
+
+    def _invalidate_order_caches(self, symbol=None):
+        """Drop cached open orders and positions, and the cached leverage for symbol if given."""
+        self._open_orders_cache = None
+        self._positions_cache = None
+        if symbol is None:
+            self._leverage_cache.clear()
+        else:
+            self._leverage_cache.pop(symbol, None)
+
     def edit_position_sl_tp(self, symbol, pos_amt, entry_price):
         """Edit SL/TP for a position."""
+        # Reuse the last positions refresh if available, else fetch in the background
+        if self._open_orders_cache is not None:
+            open_orders = [order for order in self._open_orders_cache if order['symbol'] == symbol]
+            self._prompt_sl_tp(symbol, pos_amt, entry_price, open_orders)
+        else:
+            self._submit(
+                self._blocking_get_open_orders, symbol,
+                on_done=lambda orders: self._prompt_sl_tp(symbol, pos_amt, entry_price, orders)
+            )
+
+    def _blocking_get_open_orders(self, symbol):
+        """Fetch open orders for symbol, warming its leverage alongside (runs on the I/O pool)."""
+        # The warm-up only saves a later round-trip; its failure must not block the edit
+        leverage_future = self._fanout_pool.submit(self._get_leverage_cached, symbol)
         try:
-            # Get current SL/TP values
             open_orders = self.trader.client.futures_get_open_orders(symbol=symbol)
-            sl_order = next((order for order in open_orders if order['type'] == 'STOP_MARKET'), None)
-            tp_order = next((order for order in open_orders if order['type'] == 'TAKE_PROFIT_MARKET'), None)
+        except Exception as e:
+            self.log_message(f"Error editing position SL/TP: {str(e)}")
+            return None
+        try:
+            leverage_future.result()
+        except Exception as e:
+            self.log_message(f"Error fetching leverage for {symbol}: {str(e)}")
+        return open_orders
+
+    def _prompt_sl_tp(self, symbol, pos_amt, entry_price, open_orders):
+        """Ask for new SL/TP values and submit the replacement orders."""
+        if open_orders is None:
+            return
+        try:
+            # Get current SL/TP values in one pass (first match of each wins)
+            sl_order = tp_order = None
+            for order in open_orders:
+                order_type = order['type']
+                if order_type == 'STOP_MARKET' and sl_order is None:
+                    sl_order = order
+                elif order_type == 'TAKE_PROFIT_MARKET' and tp_order is None:
+                    tp_order = order
+                if sl_order and tp_order:
+                    break
             
             current_sl_percent = 0
             current_tp_percent = 0
@@ -928,19 +1387,33 @@ class TradingGUI:
             if new_tp is None:
                 return
             
-            # Cancel existing SL/TP orders
-            if sl_order:
-                self.trader.client.futures_cancel_order(symbol=symbol, orderId=sl_order['orderId'])
-            if tp_order:
-                self.trader.client.futures_cancel_order(symbol=symbol, orderId=tp_order['orderId'])
-            
-            # Place new SL/TP orders
-            direction = 'long' if pos_amt > 0 else 'short'
-            leverage = float(self.trader.client.futures_position_information(symbol=symbol)[0]['leverage'])
-            
-            success = self.trader.place_stop_loss_take_profit(
-                symbol, entry_price, pos_amt, direction, new_sl, new_tp, leverage
+            order_ids = [o['orderId'] for o in (sl_order, tp_order) if o]
+            self._open_orders_cache = None
+            self._submit(
+                self._blocking_replace_sl_tp, symbol, pos_amt, entry_price, order_ids, new_sl, new_tp,
+                on_done=lambda _: self._refresh_now()
             )
+                
+        except Exception as e:
+            self.log_message(f"Error editing position SL/TP: {str(e)}")
+
+    def _blocking_replace_sl_tp(self, symbol, pos_amt, entry_price, order_ids, new_sl, new_tp):
+        """Cancel the old SL/TP orders and place new ones (runs on the I/O pool)."""
+        try:
+            with self._symbol_lock(symbol):
+                # Cancel existing SL/TP orders in one request; keep the old ones
+                # rather than add new orders next to any that are still live
+                if not self.trader.cancel_orders_batch(symbol, order_ids):
+                    self.log_message(f"Failed to update SL/TP for {symbol}: old orders not cancelled")
+                    return
+                
+                # Place new SL/TP orders
+                direction = 'long' if pos_amt > 0 else 'short'
+                leverage = self._get_leverage_cached(symbol)
+                
+                success = self.trader.place_stop_loss_take_profit(
+                    symbol, entry_price, pos_amt, direction, new_sl, new_tp, leverage
+                )
             
             if success:
                 self.log_message(f"Successfully updated SL/TP for {symbol} to SL={new_sl:.1f}%, TP={new_tp:.1f}%")
@@ -949,96 +1422,201 @@ class TradingGUI:
                 
         except Exception as e:
             self.log_message(f"Error editing position SL/TP: {str(e)}")
-        finally:
-            self.update_positions_and_price()
 
     def close_single_position(self, symbol, size):
         """Close a single position."""
+        self.log_message(f"Closing position: {symbol}, Size: {size}")
+        self._close_deadline_for.pop(symbol, None)
+        self._submit(self._blocking_close_single_position, symbol, size,
+                     on_done=lambda _: self._refresh_now())
+
+    def _blocking_close_single_position(self, symbol, size):
+        """Cancel SL/TP orders and close the position (runs on the I/O pool)."""
         try:
-            self.log_message(f"Closing position: {symbol}, Size: {size}")
-            
-            # First cancel any existing SL/TP orders
-            try:
-                open_orders = self.trader.client.futures_get_open_orders(symbol=symbol)
-                for order in open_orders:
-                    if order['type'] in ['STOP_MARKET', 'TAKE_PROFIT_MARKET']:
-                        self.trader.client.futures_cancel_order(
-                            symbol=symbol,
-                            orderId=order['orderId']
-                        )
-                        self.log_message(f"Cancelled {order['type']} order for {symbol}")
-            except Exception as e:
-                self.log_message(f"Error cancelling SL/TP orders: {str(e)}")
-            
-            # Then close the position
-            success = self.trader.close_position(contract=symbol, size=size, price='0', tif='IOC')
+            with self._symbol_lock(symbol):
+                # First cancel any existing SL/TP orders
+                try:
+                    open_orders = self.trader.client.futures_get_open_orders(symbol=symbol)
+                    sl_tp_orders = [order for order in open_orders
+                                    if order['type'] in ['STOP_MARKET', 'TAKE_PROFIT_MARKET']]
+                    if self.trader.cancel_orders_batch(symbol, [order['orderId'] for order in sl_tp_orders]):
+                        for order in sl_tp_orders:
+                            self.log_message(f"Cancelled {order['type']} order for {symbol}")
+                except Exception as e:
+                    self.log_message(f"Error cancelling SL/TP orders: {str(e)}")
+                
+                # Then close the position
+                success = self.trader.close_position(contract=symbol, size=size, price='0', tif='IOC')
+            self._invalidate_order_caches(symbol)
             
             if success:
                 self.log_message(f"Successfully closed position: {symbol}")
                 # Remove the symbol from sl_tp_orders if it exists
-                if hasattr(self.trader, 'sl_tp_orders') and symbol in self.trader.sl_tp_orders:
-                    del self.trader.sl_tp_orders[symbol]
+                self.trader.sl_tp_orders.pop(symbol, None)
             else:
                 self.log_message(f"Failed to close position: {symbol}")
                 
         except Exception as e:
             self.log_message(f"Error closing position: {str(e)}")
-        finally:
-            self.update_positions_and_price()
 
     def update_market_price(self):
-        """Update market price and indicators with timeout handling."""
+        """Fetch market data in the background and update the labels when it arrives."""
+        # Read Tk variables here; the worker must not touch widgets
+        contract = self.contract_var.get()
+        if not contract or self.is_updating_price:
+            return
+        self.is_updating_price = True
+        self._io_pool.submit(self._market_data_task, contract)
+
+    def _market_data_task(self, contract):
+        """Publish a fresh market sample and schedule at most one GUI flush for it."""
         try:
-            # Get the selected contract
-            contract = self.contract_var.get()
-            if not contract:
-                return
-            
-            # Fetch klines data with timeout
-            klines = self.trader.client.futures_klines(
-                symbol=contract,
-                interval='5m',
-                limit=100,
-                timeout=5
-            )
+            data = self._blocking_market_data(contract)
+        finally:
+            self.is_updating_price = False
+        if data is None:
+            return
+        self._latest_market = data
+        if not self._gui_pending:
+            self._gui_pending = True
+            self._ui_queue.put(('call', (self._flush_gui, ())))
+
+    def _blocking_market_data(self, contract):
+        """Fetch klines, compute indicators and the signal (runs on the I/O pool)."""
+        try:
+            # Fetch klines data with short, retried timeouts. Once the close window is
+            # warm only the settling and forming candles are needed
+            last_open = self._last_open_time
+            warm = contract == self._closes_contract and last_open is not None
+            klines = self._fetch_klines(contract, '5m', 2 if warm else 100)
+            if klines and warm and not 0 <= klines[-1][0] - last_open <= 300000:
+                # Missed a candle (or the clock went backwards): re-warm from a full window
+                klines = self._fetch_klines(contract, '5m', 100)
             
             if not klines:
-                return
+                return None
+
+            # Same forming candle at the same close: nothing on screen can change
+            if (contract == self._closes_contract and klines[-1][0] == self._last_open_time
+                    and float(klines[-1][4]) == self._closes[-1]):
+                return None
 
             # Calculate indicators
-            closes = pd.Series([float(k[4]) for k in klines])
-            current_price = closes.iloc[-1]
-            ma7 = closes.rolling(window=7).mean().iloc[-1]
-            ma25 = closes.rolling(window=25).mean().iloc[-1]
+            self._update_close_window(contract, klines)
+            c = self._closes
+            current_price = c[-1]
+            self._last_price[contract] = (current_price, time.time())
+            ma7 = self._sum7 / 7
+            ma25 = self._sum25 / 25
+            # Previous bar's MAs: drop the newest close, add back the one before the window
+            prev_ma7 = (self._sum7 - c[-1] + c[-8]) / 7
+            prev_ma25 = (self._sum25 - c[-1] + c[-26]) / 25
             
-            # Calculate RSI
-            rsi = self.calculate_rsi(closes, periods=14)
-            current_rsi = rsi.iloc[-1] if not pd.isna(rsi.iloc[-1]) else 50
+            # RSI with the forming candle applied provisionally to the settled averages
+            current_rsi = _rsi_from_avgs(*_wilder_step(self._avg_gain, self._avg_loss, c[-1] - c[-2]))
 
-            # Store previous values for signal calculation
-            self.prev_ma7 = closes.rolling(window=7).mean().iloc[-2]
-            self.prev_ma25 = closes.rolling(window=25).mean().iloc[-2]
-            self.prev_price = closes.iloc[-2]
+            signal = self.generate_signal(contract, current_price, ma7, ma25, c)
+            latest_row, latest_flows = self.read_latest_coinglass_row()
 
-            # Generate signal
-            signal = self.generate_signal(current_price, ma7, ma25)
+            return {
+                'price': current_price, 'ma7': ma7, 'ma25': ma25,
+                'prev_price': c[-2], 'prev_ma7': prev_ma7, 'prev_ma25': prev_ma25,
+                'rsi': current_rsi, 'signal': signal,
+                'coinglass_row': latest_row, 'coinglass_flows': latest_flows,
+            }
             
-            # Update GUI elements in a single batch
-            def update_gui():
-                self.price_label.config(text=f"Price: {current_price:,.2f}")
-                self.ma7_label.config(text=f"MA7: {ma7:.2f}")
-                self.ma25_label.config(text=f"MA25: {ma25:.2f}")
-                self.signal_label.config(
-                    text=f"Signal: {signal} (RSI: {current_rsi:.1f})",
-                    foreground=self.get_signal_color(signal)
+        except Exception as e:
+            self.log_message(f"Error updating market price: {str(e)}")
+            return None
+
+    def _fetch_klines(self, symbol, interval, limit, attempts=2, base_timeout=2.0):
+        """Fetch klines, doubling the timeout on each retry; None if every attempt fails.
+
+        Successful round-trips feed an RTT average that sets the price poll cadence.
+        """
+        timeout = base_timeout
+        for attempt in range(1, attempts + 1):
+            start = time.time()
+            try:
+                klines = self.trader.client.futures_klines(
+                    symbol=symbol, interval=interval, limit=limit, timeout=timeout
                 )
-                self.update_signal_history(signal, current_rsi)
-                
-                # Load and update Coinglass data
-                self.load_coinglass_data()
-            
-            # Schedule GUI updates to run in the main thread
-            self.root.after_idle(update_gui)
+            except Exception as e:
+                self.log_message(f"Kline fetch for {symbol} failed (attempt {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    # Jittered backoff so retries don't line up with other pollers
+                    time.sleep(random.uniform(0.1, 0.5) * attempt)
+                timeout *= 2
+                continue
+
+            rtt = time.time() - start
+            ema = self._last_rtt_ema
+            self._last_rtt_ema = rtt if ema is None else 0.8 * ema + 0.2 * rtt
+            # Poll faster on a quick link and back off on a slow one
+            self.update_interval = min(max(int(1000 * max(1.0, 3 * self._last_rtt_ema)), 1000), 10000)
+            return klines
+        return None
+
+    def _update_close_window(self, contract, klines):
+        """Fold the latest klines into the close window, keeping MA sums in O(1)."""
+        open_time = klines[-1][0]
+        close = float(klines[-1][4])
+        c = self._closes
+        if (contract != self._closes_contract or self._last_open_time is None
+                or open_time < self._last_open_time or open_time - self._last_open_time > 300000):
+            # Cold start, contract switch or a gap: rebuild from the full response
+            closes = np.fromiter((k[4] for k in klines), dtype=np.float64, count=len(klines))
+            c.clear()
+            c.extend(closes.tolist())
+            self._sum7 = float(closes[-7:].sum())
+            self._sum25 = float(closes[-25:].sum())
+            self._avg_gain, self._avg_loss = _wilder_seed(closes[:-1])
+            self._closes_contract = contract
+        elif open_time == self._last_open_time:
+            # Same candle still forming: swap in its latest close
+            self._sum7 += close - c[-1]
+            self._sum25 += close - c[-1]
+            c[-1] = close
+        else:
+            # A new candle opened; settle the previous one at its final close first
+            final = float(klines[-2][4])
+            self._sum7 += final - c[-1]
+            self._sum25 += final - c[-1]
+            c[-1] = final
+            self._avg_gain, self._avg_loss = _wilder_step(self._avg_gain, self._avg_loss, final - c[-2])
+            self._sum7 += close - c[-7]
+            self._sum25 += close - c[-25]
+            c.append(close)
+        self._last_open_time = open_time
+
+    def _flush_gui(self):
+        """Apply the latest market sample to the labels in one pass."""
+        self._gui_pending = False
+        data = self._latest_market
+        if data is None:
+            return
+        try:
+            # Store previous values for signal calculation
+            self.prev_ma7 = data['prev_ma7']
+            self.prev_ma25 = data['prev_ma25']
+            self.prev_price = data['prev_price']
+
+            self._queue_ui(self.price_label, text=f"Price: {data['price']:,.2f}")
+            self._queue_ui(self.ma7_label, text=f"MA7: {data['ma7']:.2f}")
+            self._queue_ui(self.ma25_label, text=f"MA25: {data['ma25']:.2f}")
+
+            signal = data['signal']
+            # The label shows the streamed Wilder RSI(14); generate_signal still
+            # tests the simple-average RSI against its thresholds, so name it
+            self._queue_ui(
+                self.signal_label,
+                text=f"Signal: {signal} (Wilder RSI: {data['rsi']:.1f})",
+                foreground=self.get_signal_color(signal)
+            )
+            self.update_signal_history(signal, data['rsi'])
+
+            # Update Coinglass data
+            self.render_coinglass_row(data['coinglass_row'], data['coinglass_flows'])
             
         except Exception as e:
             self.log_message(f"Error updating market price: {str(e)}")
@@ -1054,37 +1632,33 @@ class TradingGUI:
                     self.prev_signal_time is None or 
                     (current_time - self.prev_signal_time).total_seconds() >= 300):
                     
-                    self.signal_history.append((current_time, signal))
-                    if len(self.signal_history) > 100:
-                        self.signal_history.pop(0)
+                    self._append_history(current_time, signal)
                     
                     self.prev_signal = signal
                     self.prev_signal_time = current_time
             
-            # Update signal history display
-            def update_history_display():
-                self.signal_history_text.config(state='normal')
-                self.signal_history_text.delete(1.0, tk.END)
-                for ts, sig in reversed(self.signal_history[-10:]):
-                    self.signal_history_text.insert(tk.END, f"{ts.strftime('%H:%M:%S')}: {sig}\n")
-                self.signal_history_text.config(state='disabled')
-            
-            # Schedule history display update to run in the main thread
-            self.root.after_idle(update_history_display)
-            
         except Exception as e:
             self.log_message(f"Error updating signal history: {str(e)}")
 
+    def _append_history(self, ts, signal):
+        """Record a signal and append just its line to the history widget."""
+        # The widget holds one line per history entry, so a full deque means
+        # the oldest line is about to be evicted along with its entry
+        evict = len(self.signal_history) == self.signal_history.maxlen
+        self.signal_history.append((ts, signal))
+        # Only follow new lines if the user hasn't scrolled up
+        at_bottom = self.signal_history_text.yview()[1] > 0.99
+        self.signal_history_text.config(state='normal')
+        if evict:
+            self.signal_history_text.delete('1.0', '2.0')
+        self.signal_history_text.insert(tk.END, f"{ts.strftime('%H:%M:%S')}: {signal}\n", signal)
+        self.signal_history_text.config(state='disabled')
+        if at_bottom:
+            self.signal_history_text.see(tk.END)
+
     def get_signal_color(self, signal):
         """Return color for signal display."""
-        colors = {
-            "STRONG BUY": "dark green",
-            "BUY": "green",
-            "NO SIGNAL": "black",
-            "SELL": "red",
-            "STRONG SELL": "dark red"
-        }
-        return colors.get(signal, "black")
+        return _SIGNAL_COLORS.get(signal, "black")
 
     def execute_trade(self):
         self.log_message("Starting trade execution...")
@@ -1098,23 +1672,49 @@ class TradingGUI:
         params['take_profit'] = float(self.tp_var.get())
         
         self.log_message(f"Executing trade with TP={params['take_profit']}%, SL={params['stop_loss']}%")
-        success = self.trader.execute_trade(params)
-        
-        if success:
-            contract = params['contract']
+        self._submit(self._blocking_execute_trade, params, on_done=self._on_trade_done)
+
+    def _blocking_execute_trade(self, params):
+        """Place the order and its SL/TP (runs on the I/O pool).
+
+        Returns the contract when SL/TP were placed, otherwise None.
+        """
+        contract = params['contract']
+        # Size market orders from the price loop's last close when it is fresh,
+        # else from the streamed mark price, before falling back to a ticker call
+        price, fetched_at = self._last_price.get(contract, (None, 0))
+        if params['price'] in ('0', '0.0'):
+            if time.time() - fetched_at < 3:
+                params['last_price'] = price
+            elif self.market_buffer is not None:
+                params['last_price'] = self.market_buffer.mark_price(contract)
+        with self._symbol_lock(contract):
+            success = self.trader.execute_trade(params)
+            self._invalidate_order_caches(contract)
+            
+            if not success:
+                self.log_message("Failed to execute trade")
+                return None
+
             direction = params['direction']
             size = self.trader.calculate_position_size(params)
             
             if size <= 0:
                 self.log_message(f"Invalid position size: {size}")
-                return
-
-            # Get the actual entry price from the position
-            positions = self.trader.get_open_positions()
-            position = next((pos for pos in positions if pos['symbol'] == contract and float(pos['positionAmt']) != 0), None)
+                return None
+
+            # Get the actual entry price from the position. The fill can take a
+            # moment to show; each retry waits out the trader's position cache
+            position = None
+            for attempt in range(3):
+                if attempt:
+                    time.sleep(1)
+                position = next((pos for pos in self.trader.get_open_positions() if pos['symbol'] == contract), None)
+                if position:
+                    break
             if not position:
                 self.log_message(f"No open position found for {contract} after trade execution")
-                return
+                return None
 
             entry_price = float(position['entryPrice'])
             leverage = float(params['leverage'])
@@ -1127,48 +1727,82 @@ class TradingGUI:
                 )
                 if success:
                     self.log_message(f"Successfully executed trade with TP={params['take_profit']}%, SL={params['stop_loss']}%")
-                    
-                    # Schedule position close after 1 hour
-                    self.root.after(3600000, lambda: self.close_position_if_open(contract))
-                else:
-                    self.log_message("Failed to place SL/TP orders")
+                    return contract
+                self.log_message("Failed to place SL/TP orders")
             except Exception as e:
                 self.log_message(f"Error placing SL/TP orders: {e}")
-        else:
-            self.log_message("Failed to execute trade")
-        
-        self.update_positions_and_price()
+            return None
+
+    def _on_trade_done(self, contract):
+        """Arm the 1-hour close for a filled trade and refresh the table."""
+        if contract and contract not in self._close_deadline_for:
+            # Schedule position close after 1 hour (an earlier pending deadline wins)
+            deadline = time.time() + self.position_time_limit
+            self._close_deadline_for[contract] = deadline
+            heapq.heappush(self._close_deadlines, (deadline, contract))
+        self._refresh_now()
+
+    def _check_deadlines(self):
+        """Close positions whose time limit has passed; runs every 30 seconds."""
+        try:
+            now = time.time()
+            while self._close_deadlines and self._close_deadlines[0][0] <= now:
+                deadline, contract = heapq.heappop(self._close_deadlines)
+                # Skip entries cancelled by a manual close
+                if self._close_deadline_for.get(contract) != deadline:
+                    continue
+                del self._close_deadline_for[contract]
+                # A live stream buffer already knows if SL/TP closed the position
+                if self.market_buffer is not None and self.market_buffer.has_position(contract) is False:
+                    self.log_message(f"No open position found for {contract} at time limit check")
+                    continue
+                self.close_position_if_open(contract)
+        except Exception as e:
+            self.log_message(f"Error checking position time limits: {e}")
+        finally:
+            self.root.after(30000, self._check_deadlines)
 
     def close_position_if_open(self, contract):
         """Close a position if it's still open after the time limit."""
+        self._submit(self._blocking_close_position_if_open, contract,
+                     on_done=lambda closed: closed and self._refresh_now())
+
+    def _blocking_close_position_if_open(self, contract):
+        """Close contract's position if still open (runs on the I/O pool)."""
         try:
-            positions = self.trader.get_open_positions()
-            position = next((pos for pos in positions if pos['symbol'] == contract and float(pos['positionAmt']) != 0), None)
-            
-            if position:
-                self.log_message(f"Time limit reached (1 hour) - Closing position for {contract}")
-                size = float(position['positionAmt'])
-                success = self.trader.close_position(contract=contract, size=size, price='0', tif='IOC')
-                
-                if success:
-                    self.log_message(f"Successfully closed position after time limit: {contract}")
-                else:
-                    self.log_message(f"Failed to close position after time limit: {contract}")
+            with self._symbol_lock(contract):
+                position = self._positions_by_symbol().get(contract)
                 
-                self.update_positions_and_price()
-            else:
+                if position:
+                    self.log_message(f"Time limit reached (1 hour) - Closing position for {contract}")
+                    size = float(position['positionAmt'])
+                    success = self.trader.close_position(contract=contract, size=size, price='0', tif='IOC')
+                    self._invalidate_order_caches(contract)
+                    
+                    if success:
+                        self.log_message(f"Successfully closed position after time limit: {contract}")
+                    else:
+                        self.log_message(f"Failed to close position after time limit: {contract}")
+                    
+                    return True
                 self.log_message(f"No open position found for {contract} at time limit check")
         except Exception as e:
             self.log_message(f"Error in close_position_if_open for {contract}: {e}")
+        return False
 
     def close_all_positions(self):
         self.log_message("Closing all positions...")
-        success = self.trader.close_all_positions()
+        self._close_deadline_for.clear()
+        self._submit(self.trader.close_all_positions, on_done=self._on_close_all_done)
+
+    def _on_close_all_done(self, success):
+        """Report the Close All result and refresh the table."""
+        self._invalidate_order_caches()
         if success:
             self.log_message("Successfully closed all positions")
         else:
             self.log_message("Failed to close some or all positions")
-        self.update_positions_and_price()
+        self._refresh_now()
 
     def toggle_auto_trading(self):
         """Toggle automatic trading mode."""
@@ -1191,76 +1825,63 @@ class TradingGUI:
         """Check conditions for automatic trading."""
         if not self.auto_trading.get():
             return
+        # Network and indicator work runs on the pool; the next check is armed
+        # once this one has been applied, so checks never overlap
+        self._submit(self._fetch_auto_tick, self.contract_var.get(), on_done=self._render_auto_tick)
 
+    def _fetch_auto_tick(self, contract):
+        """Fetch klines, flow and positions and score the bar (runs on the I/O pool)."""
         try:
-            contract = self.contract_var.get()
-            
             # Get klines data for MA calculations
-            klines = self.trader.client.futures_klines(
-                symbol=contract,
-                interval='5m',
-                limit=100
-            )
+            klines = self._fetch_klines(contract, '5m', 100)
             
             if not klines:
-                return
+                return None
 
-            closes = pd.Series([float(k[4]) for k in klines])
-            current_price = closes.iloc[-1]
+            closes = np.fromiter((k[4] for k in klines), dtype=np.float64, count=len(klines))
+            current_price = closes[-1]
             
             # Calculate moving averages
-            ma5 = closes.rolling(window=5).mean().iloc[-1]
-            ma20 = closes.rolling(window=20).mean().iloc[-1]
-            ma50 = closes.rolling(window=50).mean().iloc[-1]
+            ma5 = closes[-5:].mean()
+            ma20 = closes[-20:].mean()
+            ma50 = closes[-50:].mean()
             
             # Calculate RSI
-            rsi = self.calculate_rsi(closes).iloc[-1]
+            rsi = _rsi_last(closes)
             
-            # Get Coinglass flow data
-            coinglass_data = self.load_coinglass_data()
-            if coinglass_data:
-                flow_5m = coinglass_data.get('5m', 0)
-            else:
-                flow_5m = 0
+            # Coinglass flow term: load_coinglass_data() returns None, so the flow has
+            # always read as 0 here; wiring the real value in would change which
+            # signals (and auto-trades) fire
+            flow_5m = 0
 
             # Check for open positions
-            positions = self.trader.get_open_positions()
-            has_open_position = any(
-                float(pos['positionAmt']) != 0 
-                for pos in positions 
-                if pos['symbol'] == contract
-            )
+            has_open_position = contract in self._positions_by_symbol()
 
+            score = 0
             if not has_open_position:
-                # Long entry conditions
-                long_conditions = (
-                    ma5 > ma20 and
-                    rsi < 20 and
-                    flow_5m < -500000 and
-                    current_price > ma50
-                )
-
-                # Short entry conditions
-                short_conditions = (
-                    ma5 < ma20 and
-                    rsi > 80 and
-                    flow_5m > 500000 and
-                    current_price < ma50
-                )
-
-                if long_conditions:
-                    self.direction_var.set("long")
-                    self.execute_auto_trade()
-                elif short_conditions:
-                    self.direction_var.set("short")
-                    self.execute_auto_trade()
+                score = _score([current_price], [ma5], [ma20], [ma50], [rsi], [flow_5m])[0]
 
             self.log_message(
                 f"Auto Check - Price: {current_price:.2f}, MA5: {ma5:.2f}, "
                 f"MA20: {ma20:.2f}, MA50: {ma50:.2f}, RSI: {rsi:.1f}, "
                 f"Flow 5m: {flow_5m:,.0f}"
             )
+            return score
 
+        except Exception as e:
+            self.log_message(f"Error in auto trading check: {str(e)}")
+            return None
+
+    def _render_auto_tick(self, score):
+        """Act on an auto-trading score and arm the next check."""
+        try:
+            if self.auto_trading.get():
+                if score == 1:
+                    self.direction_var.set("long")
+                    self.execute_auto_trade()
+                elif score == -1:
+                    self.direction_var.set("short")
+                    self.execute_auto_trade()
         except Exception as e:
             self.log_message(f"Error in auto trading check: {str(e)}")
         finally:
@@ -1283,21 +1904,22 @@ class TradingGUI:
             }
 
             self.log_message(f"Auto Trading - Executing {params['direction']} trade on {params['contract']}")
-            success = self.trader.execute_trade(params)
-
-            if success:
-                self.log_message("Auto Trading - Trade executed successfully")
-            else:
-                self.log_message("Auto Trading - Trade execution failed")
+            self._submit(self.trader.execute_trade, params, on_done=self._on_auto_trade_done)
 
         except Exception as e:
             self.log_message(f"Error in auto trade execution: {str(e)}")
 
+    def _on_auto_trade_done(self, success):
+        """Report an auto trade's result and refresh the table."""
+        self._invalidate_order_caches()
+        if success:
+            self.log_message("Auto Trading - Trade executed successfully")
+        else:
+            self.log_message("Auto Trading - Trade execution failed")
+        self._refresh_now()
+
     def schedule_updates(self):
         """Schedule periodic updates for various components."""
-        # Update positions and price every 5 seconds
-        self.root.after(5000, self.update_positions_and_price)
-        
         # Update exchange flow data every 5 seconds
         self.root.after(5000, self.load_coinglass_data)
         
@@ -2,72 +2,47 @@ import tkinter as tk
 from tkinter import messagebox
 import os
 import sys
-import subprocess
 import threading
-import time
 from dotenv import load_dotenv
 from trader import BinanceFuturesTrader
 from gui import TradingGUI
-from datetime import datetime
+from market_data import MarketDataBuffer, start_market_streams
+from crawler_manager import CrawlerManager
+
+def start_bar_close_stream(stream_manager, symbol, interval, wake_event, on_message=None):
+    """Set wake_event once per futures kline bar for symbol; returns True if subscribed.
+
+    The event fires on the first update of each new bar, just after the previous
+    one closes, so the forming bar is already known when the strategy runs.
+    on_message, if given, receives every kline message before wake_event is set.
+    """
+    last_open_time = [None]
+
+    def on_kline(msg):
+        data = msg.get('data', msg)
+        k = data.get('k')
+        if not k:
+            return
+        if on_message is not None:
+            on_message(msg)
+        if not k.get('x') and k['t'] != last_open_time[0]:
+            if last_open_time[0] is not None:
+                wake_event.set()
+            last_open_time[0] = k['t']
 
-def start_coinglass_crawler():
-    """Start the Coinglass crawler in a separate process with enhanced monitoring."""
     try:
-        # Get the absolute path to btc_crawler.py using the current script's location
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        crawler_path = os.path.abspath(os.path.join(current_dir, '..', 'coinglass', 'btc_crawler.py'))
-        
-        print(f"Looking for crawler at: {crawler_path}")
-        
-        if not os.path.exists(crawler_path):
-            print(f"Error: Crawler script not found at {crawler_path}")
-            return None
-            
-        # Create logs directory if it doesn't exist
-        logs_dir = os.path.join(os.path.dirname(crawler_path), 'logs')
-        os.makedirs(logs_dir, exist_ok=True)
-        
-        # Set up log files with absolute paths
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        stdout_log = os.path.join(logs_dir, f'crawler_output_{timestamp}.log')
-        stderr_log = os.path.join(logs_dir, f'crawler_error_{timestamp}.log')
-        
-        print(f"Starting crawler process...")
-        
-        # Start the crawler script
-        startupinfo = None
-        if sys.platform == 'win32':
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        
-        # Start the crawler with output redirection to files
-        with open(stdout_log, 'w', encoding='utf-8') as stdout_file, \
-             open(stderr_log, 'w', encoding='utf-8') as stderr_file:
-            
-            crawler_process = subprocess.Popen(
-                [sys.executable, crawler_path],
-                stdout=stdout_file,
-                stderr=stderr_file,
-                startupinfo=startupinfo,
-                cwd=os.path.dirname(crawler_path)  # Set working directory to crawler's directory
-            )
-            
-            # Check if process started successfully
-            time.sleep(2)
-            if crawler_process.poll() is None:
-                print(f"Started Coinglass crawler (PID: {crawler_process.pid})")
-                print(f"Logs are being written to:\nOutput: {stdout_log}\nErrors: {stderr_log}")
-                return crawler_process
-            else:
-                print("Error: Crawler process failed to start")
-                return None
-            
+        stream_manager.start_kline_futures_socket(callback=on_kline, symbol=symbol, interval=interval)
+        return True
     except Exception as e:
-        print(f"Error starting Coinglass crawler: {e}")
-        return None
+        print(f"Error starting {symbol} {interval} kline stream: {e}")
+        return False
 
-def strategy_loop(trader, stop_event):
-    """Run the trading strategy in a loop."""
+def strategy_loop(trader, stop_event, wake_event):
+    """Run the trading strategy once per 5m bar.
+
+    wake_event is set by the kline stream as each bar opens and by shutdown; without
+    a stream the 5 minute timeout keeps the old cadence.
+    """
     try:
         print("Starting strategy execution loop...")
         while not stop_event.is_set():
@@ -75,15 +50,13 @@ def strategy_loop(trader, stop_event):
                 # Execute strategy for BTCUSDT
                 trader.execute_strategy("BTCUSDT")
                 
-                # Wait for 5 minutes before next check (matching the timeframe)
-                for _ in range(30):  # 30 * 10 seconds = 5 minutes
-                    if stop_event.is_set():
-                        break
-                    time.sleep(10)  # Check every 10 seconds if we need to stop
+                # Sleep until the next bar opens (or we are told to stop)
+                wake_event.wait(300)
+                wake_event.clear()
                     
             except Exception as e:
                 print(f"Error in strategy loop: {e}")
-                time.sleep(10)  # Wait before retrying
+                stop_event.wait(10)  # Wait before retrying
                 
     except Exception as e:
         print(f"Fatal error in strategy loop: {e}")
@@ -92,8 +65,9 @@ def strategy_loop(trader, stop_event):
 
 def main():
     try:
-        # Start Coinglass crawler first
-        crawler_process = start_coinglass_crawler()
+        # Start Coinglass crawler first (--quiet discards its output instead of logging it)
+        crawler = CrawlerManager(quiet='--quiet' in sys.argv)
+        crawler.start()
         
         # Load environment variables from .env file
         load_dotenv()
@@ -105,18 +79,27 @@ def main():
 
         # Create trader instance
         trader = BinanceFuturesTrader(API_KEY, API_SECRET, testnet=True)
+
+        # Stream account updates and mark prices into memory for the GUI and trader
+        market_buffer = MarketDataBuffer()
+        stream_manager = start_market_streams(API_KEY, API_SECRET, market_buffer, ["BTCUSDT"], testnet=True)
+        if stream_manager:
+            trader.market_buffer = market_buffer
         
-        # Create stop event for strategy thread
+        # Create stop event for strategy thread, and the event that wakes it each bar
         stop_event = threading.Event()
+        wake_event = threading.Event()
+        if stream_manager:
+            start_bar_close_stream(stream_manager, "BTCUSDT", "5m", wake_event, trader.handle_kline)
         
         # Start strategy thread
-        strategy_thread = threading.Thread(target=strategy_loop, args=(trader, stop_event))
+        strategy_thread = threading.Thread(target=strategy_loop, args=(trader, stop_event, wake_event))
         strategy_thread.daemon = True  # Thread will be terminated when main program exits
         strategy_thread.start()
         
         # Create and start GUI
         root = tk.Tk()
-        app = TradingGUI(root, trader)
+        app = TradingGUI(root, trader, market_buffer if stream_manager else None)
         
         def on_closing():
             """Handle application shutdown."""
@@ -124,13 +107,15 @@ def main():
                 # Stop strategy loop
                 print("Stopping strategy execution...")
                 stop_event.set()
+                wake_event.set()
                 strategy_thread.join(timeout=5)  # Wait up to 5 seconds for thread to finish
+
+                # Stop market data streams
+                if stream_manager:
+                    stream_manager.stop()
                 
                 # Stop Coinglass crawler
-                if crawler_process:
-                    print("Terminating Coinglass crawler...")
-                    crawler_process.terminate()
-                    crawler_process.wait()  # Wait for the process to finish
+                crawler.stop()
                 
                 # Cleanup trader resources
                 trader.cleanup()
@@ -159,8 +144,8 @@ def main():
         root.destroy()
     finally:
         # Ensure crawler is terminated if something goes wrong
-        if 'crawler_process' in locals() and crawler_process:
-            crawler_process.terminate()
+        if 'crawler' in locals():
+            crawler.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,200 @@
+# market_data.py
+from binance import ThreadedWebsocketManager
+from datetime import datetime
+import threading
+import time
+
+class MarketDataBuffer:
+    """In-memory account/position/order snapshot kept current by Binance WebSocket streams.
+
+    It is seeded from REST and then patched by user-data and mark-price events.
+    Readers get copies in the same shape the REST endpoints return.
+    """
+
+    def __init__(self, staleness_budget=15, resync_interval=60):
+        self.lock = threading.Lock()
+        self.staleness_budget = staleness_budget  # seconds without any stream message
+        self.resync_interval = resync_interval  # seconds between REST re-seeds
+        self.account = {}
+        self.positions = {}  # symbol -> position dict (REST field names)
+        self.open_orders = {}  # orderId -> order dict (REST field names)
+        self.mark_prices = {}  # symbol -> float
+        self.leverage = {}  # symbol -> float, including symbols without a position
+        self.last_update = 0.0  # time of the last stream message
+        self.last_seed = 0.0  # time of the last REST seed
+        # Seeds fetched before this time may predate an order, so they don't count as fresh
+        self.resync_requested_at = 0.0
+        # orderId -> time the stream reported it filled/cancelled; REST can trail the
+        # stream, so a re-seed must not resurrect these for rest_lag seconds
+        self.closed_orders = {}
+        self.rest_lag = 60
+        # Called from the stream thread after an account or order event is applied
+        self.on_change = None
+
+    def seed(self, account_info, position_info, open_orders, fetched_at=None):
+        """Replace the snapshot with fresh REST results.
+
+        fetched_at is when the requests were started; results fetched before the
+        last request_resync() are applied but still leave a re-seed due.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self.lock:
+            self.account = {
+                'totalWalletBalance': account_info.get('totalWalletBalance', 0),
+                'totalUnrealizedProfit': account_info.get('totalUnrealizedProfit', 0),
+                'availableBalance': account_info.get('availableBalance', 0),
+            }
+            self.positions = {
+                pos['symbol']: dict(pos) for pos in position_info if float(pos.get('positionAmt', 0)) != 0
+            }
+            now = time.time()
+            self.closed_orders = {
+                order_id: closed_at for order_id, closed_at in self.closed_orders.items()
+                if now - closed_at < self.rest_lag
+            }
+            self.open_orders = {
+                order['orderId']: dict(order) for order in open_orders
+                if order['orderId'] not in self.closed_orders
+            }
+            # Account rows carry every symbol's leverage, so positions the stream opens
+            # later get it without another request
+            for pos in account_info.get('positions', []) + list(position_info):
+                if 'leverage' in pos:
+                    self.leverage[pos['symbol']] = float(pos['leverage'])
+            for symbol, pos in self.positions.items():
+                if 'leverage' not in pos and symbol in self.leverage:
+                    pos['leverage'] = str(self.leverage[symbol])
+            self.last_seed = fetched_at if fetched_at >= self.resync_requested_at else 0.0
+
+    def snapshot(self):
+        """Return (account_info, position_info, open_orders), or None if a REST re-seed is due."""
+        now = time.time()
+        with self.lock:
+            if (now - self.last_seed > self.resync_interval
+                    or now - self.last_update > self.staleness_budget):
+                return None
+            positions = []
+            for symbol, pos in self.positions.items():
+                pos = dict(pos)
+                if symbol in self.mark_prices:
+                    pos['markPrice'] = str(self.mark_prices[symbol])
+                positions.append(pos)
+            return dict(self.account), positions, [dict(o) for o in self.open_orders.values()]
+
+    def leverage_for(self, symbol):
+        """Return the leverage for symbol, or None if it is unknown or the streams are stale."""
+        with self.lock:
+            if time.time() - self.last_update > self.staleness_budget:
+                return None
+            return self.leverage.get(symbol)
+
+    def has_position(self, symbol):
+        """Return whether symbol has an open position, or None if the streams are stale."""
+        with self.lock:
+            if time.time() - self.last_update > self.staleness_budget:
+                return None
+            return symbol in self.positions
+
+    def mark_price(self, symbol):
+        """Return the streamed mark price for symbol, or None if it is unknown or stale."""
+        with self.lock:
+            if time.time() - self.last_update > self.staleness_budget:
+                return None
+            return self.mark_prices.get(symbol)
+
+    def handle_mark_price(self, msg):
+        """Apply a markPriceUpdate event."""
+        data = msg.get('data', msg)
+        if data.get('e') == 'error':
+            self.request_resync()
+            return
+        if data.get('e') != 'markPriceUpdate':
+            return
+        with self.lock:
+            self.mark_prices[data['s']] = float(data['p'])
+            self.last_update = time.time()
+
+    def request_resync(self):
+        """Make snapshot() return None until a REST seed started after this call lands."""
+        with self.lock:
+            self.last_seed = 0.0
+            self.resync_requested_at = time.time()
+
+    def handle_user_event(self, msg):
+        """Apply ACCOUNT_UPDATE, ORDER_TRADE_UPDATE and ACCOUNT_CONFIG_UPDATE events.
+
+        Stream errors (the socket manager reports these before reconnecting) and an
+        expired listen key mean events may have been missed, so they force a re-seed.
+        """
+        data = msg.get('data', msg)
+        event = data.get('e')
+        if event in ('error', 'listenKeyExpired'):
+            self.request_resync()
+            return
+        with self.lock:
+            self.last_update = time.time()
+            if event == 'ACCOUNT_UPDATE':
+                update = data['a']
+                for balance in update.get('B', []):
+                    if balance['a'] == 'USDT':
+                        self.account['totalWalletBalance'] = balance['wb']
+                for p in update.get('P', []):
+                    # One-way mode only reports the BOTH side
+                    if p.get('ps', 'BOTH') != 'BOTH':
+                        continue
+                    symbol = p['s']
+                    if float(p['pa']) == 0:
+                        self.positions.pop(symbol, None)
+                        continue
+                    pos = self.positions.get(symbol)
+                    if pos is None:
+                        # Leave leverage out rather than guess when it isn't known yet
+                        pos = self.positions[symbol] = {'symbol': symbol}
+                        if symbol in self.leverage:
+                            pos['leverage'] = str(self.leverage[symbol])
+                    pos['positionAmt'] = p['pa']
+                    pos['entryPrice'] = p['ep']
+                    pos['unRealizedProfit'] = p['up']
+                self.account['totalUnrealizedProfit'] = str(
+                    sum(float(pos.get('unRealizedProfit', 0)) for pos in self.positions.values())
+                )
+            elif event == 'ORDER_TRADE_UPDATE':
+                o = data['o']
+                if o['X'] in ('NEW', 'PARTIALLY_FILLED'):
+                    self.open_orders[o['i']] = {
+                        'symbol': o['s'],
+                        'orderId': o['i'],
+                        'type': o['ot'],
+                        'side': o['S'],
+                        'stopPrice': o['sp'],
+                        'price': o['p'],
+                        'origQty': o['q'],
+                        'status': o['X'],
+                    }
+                else:
+                    self.open_orders.pop(o['i'], None)
+                    self.closed_orders[o['i']] = time.time()
+            elif event == 'ACCOUNT_CONFIG_UPDATE' and 'ac' in data:
+                symbol = data['ac']['s']
+                self.leverage[symbol] = float(data['ac']['l'])
+                if symbol in self.positions:
+                    self.positions[symbol]['leverage'] = str(data['ac']['l'])
+            else:
+                return
+        if self.on_change is not None:
+            self.on_change()
+
+
+def start_market_streams(api_key, api_secret, buffer, symbols, testnet=True):
+    """Start the user-data and mark-price streams feeding buffer; returns the manager or None."""
+    try:
+        twm = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret, testnet=testnet)
+        twm.start()
+        twm.start_futures_user_socket(callback=buffer.handle_user_event)
+        for symbol in symbols:
+            twm.start_symbol_mark_price_socket(callback=buffer.handle_mark_price, symbol=symbol, fast=True)
+        return twm
+    except Exception as e:
+        # The GUI keeps polling REST when no stream is running
+        print(f"{datetime.now()}: Error starting market data streams: {e}")
+        return None
@@ -14,7 +14,8 @@ except Exception as e:
 
 # Test historical data
 try:
-    klines = trader.client.futures_historical_klines(symbol='BTCUSDT', interval='1m', limit=100)
+    # A single klines request; the historical helper pages and probes the listing date
+    klines = trader.client.futures_klines(symbol='BTCUSDT', interval='1m', limit=100)
     print(f"Number of Candles: {len(klines)}")
     print(f"Latest Close: {klines[-1][4]}")
 except Exception as e:
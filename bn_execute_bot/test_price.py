@@ -1,5 +1,6 @@
 # test_prices.py
 from binance.client import Client
+from concurrent.futures import ThreadPoolExecutor
 import os
 from dotenv import load_dotenv
 
@@ -10,9 +11,12 @@ if not API_KEY or not API_SECRET:
     raise ValueError("API keys not found in .env")
 
 client = Client(API_KEY, API_SECRET, testnet=True)
-ticker = client.futures_symbol_ticker(symbol='BTCUSDT')
-trades = client.futures_historical_trades(symbol='BTCUSDT', limit=1)
-mark = client.futures_mark_price(symbol='BTCUSDT')
+# The three probes are independent, so issue them together over the client's session
+with ThreadPoolExecutor(max_workers=3) as pool:
+    ticker = pool.submit(client.futures_symbol_ticker, symbol='BTCUSDT')
+    trades = pool.submit(client.futures_historical_trades, symbol='BTCUSDT', limit=1)
+    mark = pool.submit(client.futures_mark_price, symbol='BTCUSDT')
+    ticker, trades, mark = ticker.result(), trades.result(), mark.result()
 print(f"Ticker: {ticker}")
 print(f"Trades: {trades}")
 print(f"Mark: {mark}")
\ No newline at end of file
@@ -1,112 +1,512 @@
 # trader.py
 from binance.client import Client
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import sys
+import numpy as np
+import threading
 import time
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib parser is used without it
+    orjson = None
+
+# Trader messages are queued by the calling thread and written to stdout by one
+# listener thread, so trading paths never block on console I/O
+_log_queue = queue.SimpleQueue()
+_logger = logging.getLogger(__name__)
+_logger.propagate = False
+# Per-position detail from the polling paths is logged at DEBUG; set the level to
+# DEBUG to see it
+_logger.setLevel(logging.INFO)
+_log_listener = None
+
+def _start_log_listener():
+    global _log_listener
+    if _log_listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s.%(msecs)03d: %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+    _log_listener = logging.handlers.QueueListener(_log_queue, handler)
+    _log_listener.start()
+    _logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    # Flush whatever is still queued when the interpreter exits
+    atexit.register(_log_listener.stop)
+
+# Request weights of the futures endpoints the bot uses, by path suffix; anything
+# else counts as 1. Symbol-less variants of some endpoints cost more.
+_ENDPOINT_WEIGHTS = {
+    'account': 5,
+    'positionRisk': 5,
+    'exchangeInfo': 1,
+    'batchOrders': 5,
+    'allOpenOrders': 1,
+}
+_UNSCOPED_WEIGHTS = {
+    'openOrders': 40,
+    'ticker/price': 2,
+}
+
+def _request_weight(uri, params):
+    for suffix, weight in _UNSCOPED_WEIGHTS.items():
+        if uri.endswith(suffix):
+            return 1 if params.get('symbol') else weight
+    for suffix, weight in _ENDPOINT_WEIGHTS.items():
+        if uri.endswith(suffix):
+            return weight
+    return 1
+
+class _WeightLimiter:
+    """Token bucket over Binance request weight, shared by every thread using the client.
+
+    Requests wait for weight to refill instead of pushing the account into a
+    429/-1003 ban.
+    """
+
+    def __init__(self, weight_per_minute=2400):
+        self.capacity = weight_per_minute
+        self.rate = weight_per_minute / 60.0  # weight refilled per second
+        self.tokens = float(weight_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, weight):
+        weight = min(weight, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+class _FastJsonClient(Client):
+    """Client that parses successful REST responses with orjson when it is installed,
+    and paces requests through weight_limiter when one is set."""
+
+    weight_limiter = None
+    _hmac_template = None  # HMAC keyed with the API secret, copied for every signature
+
+    def _hmac_signature(self, query_string):
+        template = self._hmac_template
+        if template is None:
+            template = self._hmac_template = hmac.new(self.API_SECRET.encode('utf-8'), digestmod=hashlib.sha256)
+        # Copying the keyed state skips re-deriving the key pads on every request
+        h = template.copy()
+        h.update(query_string.encode('utf-8'))
+        return h.hexdigest()
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        if self.weight_limiter is not None:
+            self.weight_limiter.acquire(_request_weight(uri, kwargs.get('data') or {}))
+        return super()._request(method, uri, signed, force_params, **kwargs)
+
+    @staticmethod
+    def _handle_response(response):
+        if orjson is None or not 200 <= response.status_code < 300:
+            return Client._handle_response(response)
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            raise BinanceRequestException(f"Invalid Response: {response.text}")
 
 class BinanceFuturesTrader:
     def __init__(self, api_key, api_secret, testnet=True):
-        self.client = Client(api_key, api_secret, testnet=testnet)
+        _start_log_listener()
+        # Bound every REST call, so a dead pooled socket fails fast instead of
+        # hanging a trading thread
+        self.client = _FastJsonClient(api_key, api_secret, requests_params={'timeout': 10}, testnet=testnet)
+        # Keep enough pooled keep-alive connections for the GUI and trader worker
+        # threads (requests defaults to 10), so concurrent calls never re-handshake
+        self.client.session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=0))
+        # Stay under the futures limit of 2400 request weight per minute
+        self.client.weight_limiter = _WeightLimiter(2400)
         self.sl_tp_orders = {}  # Dictionary to store SL/TP order details
+        # Send orders over the persistent WebSocket API connection when the client supports it
+        self.use_ws_trade_api = True
+        self._all_positions = None  # (symbol -> position, fetched_at), dropped on every order
+        # get_open_positions result, shared by calls within one strategy tick
+        self._open_positions = None  # (open positions, fetched_at)
+        self.open_positions_ttl = 0.2  # seconds
+        self._balance = None  # (get_account_balance result, fetched_at)
+        self.balance_ttl = 1  # seconds
+        # Stream-fed MarketDataBuffer; get_open_positions reads it instead of REST while it is fresh
+        self.market_buffer = None
+        # Independent REST calls are issued together on this pool; python-binance's
+        # requests session is safe to share between threads for separate requests
+        self._pool = ThreadPoolExecutor(max_workers=4)
+        self._ticker_cache = {}  # symbol -> last price, from one all-symbol ticker request
+        self._tickers_at = 0.0
+        self.ticker_ttl = 0.5  # seconds
+        self._exchange_info_cache = None
+        self._exchange_info_ts = 0.0
+        self._exchange_info_refreshing = False
+        self.exchange_info_max_age = 86400  # seconds a stale copy may be served while refreshing
+        self._precision_map = {}  # symbol -> (pricePrecision, quantityPrecision)
+        self._tick_map = {}  # symbol -> (PRICE_FILTER tickSize, LOT_SIZE stepSize) as Decimals
+        self.positions_ttl = 1  # seconds
+        # Closed klines pushed by the kline stream: (symbol, interval) -> deque of
+        # [open_time, open, high, low, close] rows, as futures_klines returns them
+        self._stream_klines = {}
+        # Latest update of the bar still forming, (symbol, interval) -> (row, received_at);
+        # futures_klines includes that bar, so the strategy RSI does too
+        self._forming_klines = {}
+        # Rolling RSI state over the streamed closes, (symbol, interval) -> dict; the
+        # gain/loss sums are updated in O(1) per closed bar
+        self._rsi_state = {}
+        self.stream_rsi_period = 5
+        self.time_sync_interval = 30  # seconds between background clock re-syncs
+        self._stop_event = threading.Event()
         try:
             # Sync client time with Binance server time
-            server_time = self.client.get_server_time()
-            local_time = int(time.time() * 1000)
-            time_diff = server_time['serverTime'] - local_time
-            self.client.timestamp_offset = time_diff
+            time_diff = self.sync_time()
             self.log_message(f"Adjusted timestamp offset by {time_diff}ms to sync with server")
         except Exception as e:
             self.log_message(f"Error initializing trader: {e}")
+        # The time request above opened a pooled connection; load exchange info in the
+        # background too, so the first order pays neither the handshake nor the download
+        self._pool.submit(self._refresh_exchange_info)
+        # Keep the offset current off the trading path, so signed requests are never
+        # rejected for clock drift mid-trade
+        threading.Thread(target=self._time_sync_loop, daemon=True).start()
+
+    def sync_time(self):
+        """Set the client's timestamp offset from the futures server time; returns it in ms.
+
+        The server stamps its reply roughly mid-flight, so the local time is taken
+        as the midpoint of the round-trip.
+        """
+        sent = time.time()
+        sent_mono = time.monotonic()
+        server_time = self.client.futures_time()['serverTime']
+        local_time = sent + (time.monotonic() - sent_mono) / 2
+        time_diff = int(server_time - local_time * 1000)
+        self.client.timestamp_offset = time_diff
+        return time_diff
+
+    def _time_sync_loop(self):
+        while not self._stop_event.wait(self.time_sync_interval):
+            try:
+                previous = getattr(self.client, 'timestamp_offset', 0)
+                time_diff = self.sync_time()
+                if abs(time_diff - previous) > 100:
+                    self.log_message(f"Adjusted timestamp offset by {time_diff}ms to sync with server")
+            except Exception as e:
+                self.log_message(f"Error syncing server time: {e}")
 
     def log_message(self, message):
-        """Log messages for debugging; replace with your logging mechanism if needed."""
-        print(f"{datetime.now()}: {message}")
+        """Queue a message for the log listener thread; safe to call from any thread."""
+        _logger.info(message)
+
+    def log_debug(self, message, *args):
+        """Queue a per-position detail message, formatted lazily and dropped unless DEBUG is enabled."""
+        _logger.debug(message, *args)
+
+    def _ws_or_rest(self, ws_name, rest_call, retry_on_timeout, **params):
+        """Send an order request over the WebSocket API, falling back to REST.
+
+        Exchange rejections are not retried, except a -1021 timestamp rejection,
+        which is retried once after re-syncing the clock. Other WebSocket failures
+        (timeouts, dropped connections) are only retried over REST when
+        retry_on_timeout is set, since the original may still have been applied;
+        otherwise they are raised so the caller can check the exchange state. The
+        REST fallback is always used when the WebSocket call is unavailable or the
+        connection was refused before anything was sent.
+        """
+        try:
+            return self._send_order_request(ws_name, rest_call, retry_on_timeout, **params)
+        except BinanceAPIException as e:
+            if e.code != -1021:
+                raise
+            # The request was refused outright, so sending it again is safe
+            self.log_message(f"Timestamp rejected for {ws_name}, re-syncing server time: {e}")
+            self.sync_time()
+            return self._send_order_request(ws_name, rest_call, retry_on_timeout, **params)
+
+    def _send_order_request(self, ws_name, rest_call, retry_on_timeout, **params):
+        ws_call = getattr(self.client, ws_name, None) if self.use_ws_trade_api else None
+        if ws_call is not None:
+            try:
+                return ws_call(**params)
+            except BinanceAPIException:
+                raise
+            except ConnectionRefusedError as e:
+                # No connection was made, so the request never left the client
+                self.log_message(f"WebSocket {ws_name} connection refused, sending over REST: {e}")
+            except Exception as e:
+                # The request may have reached the exchange; repeating a placement
+                # over REST could open a duplicate order
+                if not retry_on_timeout:
+                    raise
+                self.log_message(f"WebSocket {ws_name} failed, retrying over REST: {e}")
+        return rest_call(**params)
+
+    def create_order(self, **params):
+        """Place a futures order (WebSocket API with REST fallback)."""
+        self._invalidate_positions()
+        return self._ws_or_rest('ws_futures_create_order', self.client.futures_create_order, False, **params)
+
+    def cancel_order(self, **params):
+        """Cancel a futures order (WebSocket API with REST fallback)."""
+        self._invalidate_positions()
+        return self._ws_or_rest('ws_futures_cancel_order', self.client.futures_cancel_order, True, **params)
+
+    def create_orders_batch(self, orders, fallback=None):
+        """Place orders via batchOrders, 5 per request; returns the placed orders in order.
+
+        Orders the exchange rejects inside the batch are retried one at a time through
+        fallback (create_order by default), so a genuine rejection still raises as before.
+        """
+        fallback = fallback or self.create_order
+        # batchOrders takes string values, with booleans spelled the JSON way
+        batch = [
+            {key: str(value).lower() if isinstance(value, bool) else str(value) for key, value in order.items()}
+            for order in orders
+        ]
+        self._invalidate_positions()
+        results = []
+        for i in range(0, len(batch), 5):
+            try:
+                results.extend(self.client.futures_place_batch_order(batchOrders=batch[i:i + 5]))
+            except BinanceAPIException as e:
+                self.log_message(f"Batch order request rejected, placing orders individually: {e}")
+                results.extend([None] * len(batch[i:i + 5]))
+        placed = list(results)
+        retry = []
+        for i, (order, result) in enumerate(zip(orders, results)):
+            if not result or 'orderId' not in result:
+                if result:
+                    self.log_message(f"Batch order rejected ({result.get('msg')}), placing it individually")
+                retry.append(i)
+        # Individual retries are independent; send them concurrently
+        for i, result in zip(retry, self._pool.map(lambda i: fallback(**orders[i]), retry)):
+            placed[i] = result
+        return placed
+
+    def _invalidate_positions(self):
+        """Drop cached positions, orders and balance after anything that changes them."""
+        self._all_positions = None
+        self._open_positions = None
+        self._balance = None
+        # The stream may not have delivered the resulting fill yet; read REST until
+        # a seed taken after this order lands
+        if self.market_buffer is not None:
+            self.market_buffer.request_resync()
 
     def get_account_balance(self):
-        """Fetch account balance in USDT."""
+        """Fetch account balance in USDT, reusing a result younger than balance_ttl."""
+        cached = self._balance
+        if cached and time.time() - cached[1] < self.balance_ttl:
+            return cached[0]
         try:
             account = self.client.futures_account()
             for asset in account['assets']:
                 if asset['asset'] == 'USDT':
-                    return {
+                    balance = {
                         'total': float(asset['walletBalance']),
                         'available': float(asset['availableBalance'])
                     }
+                    self._balance = (balance, time.time())
+                    return balance
             self.log_message("USDT balance not found")
             return None
         except Exception as e:
             self.log_message(f"Error fetching account balance: {e}")
             return None
 
+    def get_exchange_info(self, ttl=3600):
+        """Return futures exchange info, downloading it at most once per ttl seconds.
+
+        A copy older than ttl but younger than exchange_info_max_age is still
+        returned, and a refresh is started in the background.
+        """
+        age = time.time() - self._exchange_info_ts
+        if self._exchange_info_cache is None or age >= self.exchange_info_max_age:
+            self._load_exchange_info()
+        elif age >= ttl and not self._exchange_info_refreshing:
+            self._exchange_info_refreshing = True
+            self._pool.submit(self._refresh_exchange_info)
+        return self._exchange_info_cache
+
+    def _refresh_exchange_info(self):
+        try:
+            self._load_exchange_info()
+        except Exception as e:
+            self.log_message(f"Error refreshing exchange info: {e}")
+        finally:
+            self._exchange_info_refreshing = False
+
+    def _load_exchange_info(self):
+        """Download exchange info and rebuild the per-symbol precision and filter maps."""
+        info = self.client.futures_exchange_info()
+        self._precision_map = {
+            s['symbol']: (s['pricePrecision'], s['quantityPrecision']) for s in info['symbols']
+        }
+        tick_map = {}
+        for s in info['symbols']:
+            filters = {f['filterType']: f for f in s.get('filters', [])}
+            if 'PRICE_FILTER' in filters and 'LOT_SIZE' in filters:
+                tick_map[s['symbol']] = (
+                    Decimal(filters['PRICE_FILTER']['tickSize']),
+                    Decimal(filters['LOT_SIZE']['stepSize']),
+                )
+        self._tick_map = tick_map
+        self._exchange_info_cache = info
+        self._exchange_info_ts = time.time()
+
+    def get_precision(self, symbol):
+        """Return (pricePrecision, quantityPrecision) for symbol, or None if it is not listed."""
+        self.get_exchange_info()
+        return self._precision_map.get(symbol)
+
+    def quantize(self, symbol, price, quantity):
+        """Snap price and quantity to symbol's tick and step sizes.
+
+        Returns exact Decimals the exchange accepts, or None if the filters are unknown.
+        """
+        self.get_exchange_info()
+        sizes = self._tick_map.get(symbol)
+        if not sizes:
+            return None
+        tick, step = sizes
+        price = (Decimal(str(price)) / tick).to_integral_value(ROUND_HALF_UP) * tick
+        quantity = (Decimal(str(quantity)) / step).to_integral_value(ROUND_HALF_UP) * step
+        return price.quantize(tick), quantity.quantize(step)
+
+    def format_quantity(self, symbol, quantity):
+        """Return quantity as a plain decimal string rounded down to symbol's step size.
+
+        Falls back to str(quantity) if the filters are unknown.
+        """
+        self.get_exchange_info()
+        sizes = self._tick_map.get(symbol)
+        if not sizes:
+            return str(quantity)
+        step = sizes[1]
+        quantity = (Decimal(str(quantity)) / step).to_integral_value(ROUND_DOWN) * step
+        return format(quantity.quantize(step), 'f')
+
+    def _refresh_all_tickers(self):
+        """Load the last price of every symbol with one request."""
+        self._ticker_cache = {t['symbol']: float(t['price']) for t in self.client.futures_symbol_ticker()}
+        self._tickers_at = time.time()
+
+    def get_price(self, symbol):
+        """Return the last price for symbol, sharing one all-symbol ticker request within ticker_ttl."""
+        if time.time() - self._tickers_at >= self.ticker_ttl:
+            self._refresh_all_tickers()
+        price = self._ticker_cache.get(symbol)
+        if price is None:
+            # Not in the bulk response (e.g. just listed); ask for it directly
+            price = float(self.client.futures_symbol_ticker(symbol=symbol)['price'])
+        return price
+
+    def get_mark_price(self, symbol):
+        """Return symbol's streamed mark price, else its last price; 0.0 if neither is available."""
+        price = self.market_buffer.mark_price(symbol) if self.market_buffer is not None else None
+        if price:
+            return price
+        try:
+            return self.get_price(symbol)
+        except Exception as e:
+            self.log_message(f"Error fetching price for {symbol}: {e}")
+            return 0.0
+
+    def get_all_positions(self):
+        """Return position information for every symbol, keyed by symbol.
+
+        One symbol-less request covers all contracts; repeat calls within
+        positions_ttl share it, and placing an order drops it.
+        """
+        cached = self._all_positions
+        if cached and time.time() - cached[1] < self.positions_ttl:
+            return cached[0]
+        positions = {}
+        for pos in self.client.futures_position_information():
+            # A symbol can have several rows; keep its first open one, so an open
+            # position never hides behind an empty row
+            current = positions.get(pos['symbol'])
+            if current is None or (float(current['positionAmt']) == 0 and float(pos['positionAmt']) != 0):
+                positions[pos['symbol']] = pos
+        self._all_positions = (positions, time.time())
+        return positions
+
+    def get_position(self, contract):
+        """Return contract's open position, or None if it has none.
+
+        Reads a fresh all-symbol snapshot when there is one, else asks for this
+        symbol only.
+        """
+        cached = self._all_positions
+        if cached and time.time() - cached[1] < self.positions_ttl:
+            position = cached[0].get(contract)
+            if position and float(position['positionAmt']) != 0:
+                return position
+            return None
+        return next(
+            (p for p in self.client.futures_position_information(symbol=contract) if float(p['positionAmt']) != 0),
+            None
+        )
+
     def get_open_positions(self):
+        cached = self._open_positions
+        if cached and time.time() - cached[1] < self.open_positions_ttl:
+            return cached[0]
         try:
-            positions = self.client.futures_position_information()
+            snapshot = self.market_buffer.snapshot() if self.market_buffer is not None else None
+            if snapshot is not None:
+                # The user-data stream keeps positions and orders current; no requests needed
+                _, positions, orders = snapshot
+            else:
+                # Fetch positions and the open orders used to check SL/TP concurrently
+                positions_future = self._pool.submit(self.get_all_positions)
+                orders_future = self._pool.submit(self.client.futures_get_open_orders)
+                positions = positions_future.result().values()
+                orders = orders_future.result()
             open_positions = [pos for pos in positions if float(pos['positionAmt']) != 0]
-            
-            # Fetch open orders to check for SL/TP
-            orders = self.client.futures_get_open_orders()
+
+            # Index orders by (symbol, type) once; the first match wins, as with a scan
+            orders_by_key = {}
+            for order in orders:
+                orders_by_key.setdefault((order['symbol'], order['type']), order)
+
+            # Positions with SL/TP orders on the exchange are reconciled together below
+            reconcile = []
+            account_leverage = None  # symbol -> leverage from futures_account, fetched at most once
             for pos in open_positions:
                 contract = pos['symbol']
-                # Fetch leverage directly from the exchange
-                leverage = float(pos.get('leverage', 1))
-                # If leverage is 1, try to fetch it from the exchange's account settings
-                if leverage == 1:
-                    try:
-                        account_info = self.client.futures_account()
-                        for asset in account_info['positions']:
-                            if asset['symbol'] == contract and float(asset['positionAmt']) != 0:
-                                leverage = float(asset['leverage'])
-                                break
-                    except Exception as e:
-                        self.log_message(f"Error fetching leverage for {contract} from account info: {e}")
-                sl_order = next((order for order in orders if order['symbol'] == contract and order['type'] == 'STOP_MARKET'), None)
-                tp_order = next((order for order in orders if order['symbol'] == contract and order['type'] == 'TAKE_PROFIT_MARKET'), None)
+                # Position rows carry the symbol's leverage setting, 1x included
+                if 'leverage' in pos:
+                    leverage = float(pos['leverage'])
+                else:
+                    if account_leverage is None:
+                        account_leverage = self._account_leverage()
+                    leverage = account_leverage.get(contract)
+                sl_order = orders_by_key.get((contract, 'STOP_MARKET'))
+                tp_order = orders_by_key.get((contract, 'TAKE_PROFIT_MARKET'))
                 
                 # Update sl_tp_orders with actual exchange data if present
                 if sl_order or tp_order:
-                    sl_price = float(sl_order['stopPrice']) if sl_order else None
-                    tp_price = float(tp_order['stopPrice']) if tp_order else None
-                    entry_price = float(pos['entryPrice'])
-                    self.log_message(f"Fetched SL/TP prices for {contract}: sl_price={sl_price}, tp_price={tp_price}, entry_price={entry_price}, leverage={leverage}")
-                    
-                    # Calculate expected SL/TP prices based on template percentages
-                    intended_sl_percent = self.sl_tp_orders.get(contract, {}).get('sl_percent', -2.0)
-                    intended_tp_percent = self.sl_tp_orders.get(contract, {}).get('tp_percent', 5.0)
-                    direction = 'long' if float(pos['positionAmt']) > 0 else 'short'
-                    if direction == 'long':
-                        expected_sl_price = entry_price * (1 + intended_sl_percent / 100 / leverage)
-                        expected_tp_price = entry_price * (1 + intended_tp_percent / 100 / leverage)
-                    else:
-                        expected_sl_price = entry_price * (1 - intended_sl_percent / 100 / leverage)
-                        expected_tp_price = entry_price * (1 - intended_tp_percent / 100 / leverage)
-                    
-                    # Check if fetched prices match expected prices (within a small tolerance)
-                    price_tolerance = 0.1  # Allow 0.1 price unit difference
-                    sl_match = sl_price is None or abs(sl_price - expected_sl_price) <= price_tolerance
-                    tp_match = tp_price is None or abs(tp_price - expected_tp_price) <= price_tolerance
-                    
-                    # If prices match, use template percentages; otherwise, recalculate
-                    if sl_match:
-                        sl_percent = intended_sl_percent
-                    else:
-                        sl_percent = ((sl_price - entry_price) / entry_price * 100 * leverage) if sl_price else intended_sl_percent
-                    if tp_match:
-                        tp_percent = intended_tp_percent
-                    else:
-                        tp_percent = ((tp_price - entry_price) / entry_price * 100 * leverage) if tp_price else intended_tp_percent
-                    
-                    self.sl_tp_orders[contract] = {
-                        'sl_order_id': sl_order['orderId'] if sl_order else None,
-                        'tp_order_id': tp_order['orderId'] if tp_order else None,
-                        'sl_percent': sl_percent,
-                        'tp_percent': tp_percent,
-                        'sl_price': sl_price,
-                        'tp_price': tp_price,
-                        'sl_status': 'open' if sl_order else 'none',
-                        'tp_status': 'open' if tp_order else 'none',
-                        'leverage': leverage
-                    }
-                    self.log_message(f"Updated SL/TP % for {contract}: sl_percent={self.sl_tp_orders[contract]['sl_percent']}, tp_percent={self.sl_tp_orders[contract]['tp_percent']}")
+                    if leverage is None:
+                        # The percentages depend on leverage; leave them as they are
+                        self.log_message(f"Leverage unknown for {contract}, skipping SL/TP reconciliation")
+                        continue
+                    reconcile.append((pos, leverage, sl_order, tp_order))
                 elif contract not in self.sl_tp_orders:
                     self.sl_tp_orders[contract] = {
                         'sl_order_id': None,
@@ -119,17 +519,89 @@ class BinanceFuturesTrader:
                         'tp_status': 'none',
                         'leverage': leverage
                     }
+            if reconcile:
+                self._reconcile_sl_tp(reconcile)
             
-            self.log_message(f"Fetched {len(open_positions)} open positions from exchange")
+            self.log_debug("Fetched %d open positions from exchange", len(open_positions))
+            self._open_positions = (open_positions, time.time())
             return open_positions
         except Exception as e:
             self.log_message(f"Error fetching open positions: {e}")
             return []
 
+    def _account_leverage(self):
+        """Return symbol -> leverage for open positions from futures_account, {} on error."""
+        try:
+            return {
+                p['symbol']: float(p['leverage'])
+                for p in self.client.futures_account()['positions']
+                if 'leverage' in p and float(p['positionAmt']) != 0
+            }
+        except Exception as e:
+            self.log_message(f"Error fetching leverage from account info: {e}")
+            return {}
+
+    def _reconcile_sl_tp(self, rows):
+        """Update sl_tp_orders from the SL/TP orders found on the exchange.
+
+        rows holds (position, leverage, sl_order, tp_order). The expected prices for
+        the template percentages are computed for all positions at once; a fetched
+        price within tolerance keeps the template percentage, otherwise the
+        percentage is recalculated from the fetched price.
+        """
+        contracts = [pos['symbol'] for pos, _, _, _ in rows]
+        entry = np.array([float(pos['entryPrice']) for pos, _, _, _ in rows])
+        leverage = np.array([lev for _, lev, _, _ in rows])
+        # +1 for longs, -1 for shorts
+        sign = np.array([1.0 if float(pos['positionAmt']) > 0 else -1.0 for pos, _, _, _ in rows])
+        sl_price = np.array([float(sl['stopPrice']) if sl else np.nan for _, _, sl, _ in rows])
+        tp_price = np.array([float(tp['stopPrice']) if tp else np.nan for _, _, _, tp in rows])
+        intended_sl = np.array([self.sl_tp_orders.get(c, {}).get('sl_percent', -2.0) for c in contracts], dtype=float)
+        intended_tp = np.array([self.sl_tp_orders.get(c, {}).get('tp_percent', 5.0) for c in contracts], dtype=float)
+
+        # A missing SL/TP price is NaN and keeps the template percentage
+        with np.errstate(invalid='ignore', divide='ignore'):
+            expected_sl = entry * (1 + sign * intended_sl / 100 / leverage)
+            expected_tp = entry * (1 + sign * intended_tp / 100 / leverage)
+
+            # Check if fetched prices match expected prices (within a small tolerance)
+            price_tolerance = 0.1  # Allow 0.1 price unit difference
+            sl_match = np.isnan(sl_price) | (np.abs(sl_price - expected_sl) <= price_tolerance)
+            tp_match = np.isnan(tp_price) | (np.abs(tp_price - expected_tp) <= price_tolerance)
+            # If prices match, use template percentages; otherwise, recalculate
+            sl_percent = np.where(sl_match, intended_sl, (sl_price - entry) / entry * 100 * leverage)
+            tp_percent = np.where(tp_match, intended_tp, (tp_price - entry) / entry * 100 * leverage)
+
+        for i, (pos, lev, sl_order, tp_order) in enumerate(rows):
+            contract = contracts[i]
+            sl = float(sl_price[i]) if sl_order else None
+            tp = float(tp_price[i]) if tp_order else None
+            self.log_debug("Fetched SL/TP prices for %s: sl_price=%s, tp_price=%s, entry_price=%s, leverage=%s",
+                           contract, sl, tp, entry[i], lev)
+            self.sl_tp_orders[contract] = {
+                'sl_order_id': sl_order['orderId'] if sl_order else None,
+                'tp_order_id': tp_order['orderId'] if tp_order else None,
+                'sl_percent': float(sl_percent[i]),
+                'tp_percent': float(tp_percent[i]),
+                'sl_price': sl,
+                'tp_price': tp,
+                'sl_status': 'open' if sl_order else 'none',
+                'tp_status': 'open' if tp_order else 'none',
+                'leverage': lev
+            }
+            self.log_debug("Updated SL/TP %% for %s: sl_percent=%s, tp_percent=%s",
+                           contract, self.sl_tp_orders[contract]['sl_percent'], self.sl_tp_orders[contract]['tp_percent'])
+
     def calculate_unrealized_pnl(self):
         """Calculate the unrealized profit/loss for all open positions in USDT."""
         try:
+            # The all-symbol ticker request doesn't depend on the positions; send it meanwhile
+            tickers_future = None
+            if time.time() - self._tickers_at >= self.ticker_ttl:
+                tickers_future = self._pool.submit(self._refresh_all_tickers)
             positions = self.get_open_positions()
+            if tickers_future is not None:
+                tickers_future.result()
             if not positions:
                 self.log_message("No open positions to calculate unrealized P&L")
                 return 0.0
@@ -140,9 +612,8 @@ class BinanceFuturesTrader:
                 position_amt = float(pos['positionAmt'])
                 entry_price = float(pos['entryPrice'])
                 
-                # Fetch current market price
-                ticker = self.client.futures_symbol_ticker(symbol=contract)
-                current_price = float(ticker.get('price', 0))
+                # Current market price; all positions share one ticker request
+                current_price = self.get_price(contract)
                 if current_price <= 0:
                     self.log_message(f"Invalid current price for {contract}: {current_price}")
                     continue
@@ -159,7 +630,7 @@ class BinanceFuturesTrader:
                     pnl = (entry_price - current_price) * abs(position_amt)
                 
                 total_pnl += pnl
-                self.log_message(f"Unrealized P&L for {contract} ({direction}): {pnl:.2f} USDT")
+                self.log_debug("Unrealized P&L for %s (%s): %.2f USDT", contract, direction, pnl)
 
             return total_pnl
         except Exception as e:
@@ -169,19 +640,23 @@ class BinanceFuturesTrader:
     def calculate_position_size(self, params):
         """Calculate position size based on risk, leverage, and entry price."""
         try:
+            # Balance and exchange info don't depend on the price; fetch them meanwhile
+            balance_future = self._pool.submit(self.get_account_balance)
+            info_future = self._pool.submit(self.get_exchange_info)
             risk_percentage = float(params['risk_percentage'])
             leverage = float(params['leverage'])
-            entry_price = float(params['price']) if params['price'] != '0' else float(self.client.futures_symbol_ticker(symbol=params['contract'])['price'])
+            if params['price'] not in ('0', '0.0'):
+                entry_price = float(params['price'])
+            elif params.get('last_price'):
+                # Recent price supplied by the caller saves a ticker round-trip
+                entry_price = float(params['last_price'])
+            else:
+                entry_price = self.get_price(params['contract'])
             contract = params['contract']
 
-            max_retries = 2
-            for attempt in range(max_retries):
-                if entry_price <= 0:
-                    self.log_message(f"Invalid entry price for {contract}: {entry_price}. Retrying... (Attempt {attempt + 1}/{max_retries})")
-                    time.sleep(1)
-                    entry_price = float(self.client.futures_symbol_ticker(symbol=params['contract'])['price'])
-                else:
-                    break
+            if entry_price <= 0:
+                self.log_message(f"Invalid entry price for {contract}: {entry_price}. Trying the mark price...")
+                entry_price = self.get_mark_price(contract)
             if entry_price <= 0:
                 fallback_prices = {
                     'BTCUSDT': 83000.00,
@@ -190,10 +665,10 @@ class BinanceFuturesTrader:
                     # Add more contracts as needed
                 }
                 fallback_price = fallback_prices.get(contract, 83000.00)
-                self.log_message(f"Failed to fetch valid entry price for {contract} after {max_retries} retries. Using fallback price {fallback_price}")
+                self.log_message(f"Failed to fetch valid entry price for {contract}. Using fallback price {fallback_price}")
                 entry_price = fallback_price
 
-            balance = self.get_account_balance()
+            balance = balance_future.result()
             if not balance:
                 raise ValueError("Failed to fetch account balance")
             available_balance = float(balance['available'])
@@ -202,12 +677,10 @@ class BinanceFuturesTrader:
             position_value = risk_amount * leverage
             size = position_value / entry_price
 
-            symbol_info = self.client.futures_exchange_info()['symbols']
-            for s in symbol_info:
-                if s['symbol'] == contract:
-                    quantity_precision = s['quantityPrecision']
-                    size = round(size, quantity_precision)
-                    break
+            info_future.result()
+            precision = self.get_precision(contract)
+            if precision:
+                size = round(size, precision[1])
 
             if size <= 0:
                 raise ValueError(f"Calculated position size is zero or negative: {size}")
@@ -241,13 +714,13 @@ class BinanceFuturesTrader:
                 'symbol': contract,
                 'side': side,
                 'type': order_type,
-                'quantity': str(size)
+                'quantity': self.format_quantity(contract, size)
             }
             if order_type == 'LIMIT':
                 order_params['price'] = str(price)
                 order_params['timeInForce'] = tif
 
-            order = self.client.futures_create_order(**order_params)
+            order = self.create_order(**order_params)
             self.log_message(f"Order placed successfully: {order}")
             return True
         except Exception as e:
@@ -263,19 +736,57 @@ class BinanceFuturesTrader:
                 'symbol': contract,
                 'side': side,
                 'type': order_type,
-                'quantity': str(abs(float(size)))
+                'quantity': self.format_quantity(contract, abs(float(size)))
             }
             if order_type == 'LIMIT':
                 order_params['price'] = str(price)
                 order_params['timeInForce'] = tif
 
-            order = self.client.futures_create_order(**order_params)
+            order = self.create_order(**order_params)
             self.log_message(f"Closed position for {contract}: {order}")
             return True
         except Exception as e:
             self.log_message(f"Error closing position for {contract}: {e}")
             return False
 
+    def cancel_orders_batch(self, symbol, order_ids):
+        """Cancel several orders for one symbol in a single batch request.
+
+        Orders the batch could not cancel, or a whole failed batch request, are
+        retried with one cancel call each. Returns False if any order is still
+        not cancelled.
+        """
+        order_ids = [order_id for order_id in order_ids if order_id]
+        if not order_ids:
+            return True
+        self._invalidate_positions()
+        failed = []
+        # batchOrders accepts at most 10 ids per request
+        for i in range(0, len(order_ids), 10):
+            chunk = order_ids[i:i + 10]
+            try:
+                results = self.client.futures_cancel_orders(symbol=symbol, orderIdList=json.dumps(chunk))
+            except Exception as e:
+                self.log_message(f"Batch cancel failed for {symbol}, cancelling individually: {e}")
+                failed.extend(chunk)
+                continue
+            # Failed entries come back as {"code": ..., "msg": ...} in request order
+            for order_id, result in zip(chunk, results):
+                if 'code' in result:
+                    self.log_message(f"Batch cancel of order {order_id} for {symbol} failed ({result.get('msg')}), cancelling individually")
+                    failed.append(order_id)
+        cancelled = [order_id for order_id in order_ids if order_id not in failed]
+        if cancelled:
+            self.log_message(f"Batch-cancelled orders {cancelled} for {symbol}")
+        success = True
+        for order_id in failed:
+            try:
+                self.cancel_order(symbol=symbol, orderId=order_id)
+            except Exception as e:
+                self.log_message(f"Error cancelling order {order_id} for {symbol}: {e}")
+                success = False
+        return success
+
     def close_all_positions(self):
         """Close all open positions."""
         try:
@@ -284,13 +795,33 @@ class BinanceFuturesTrader:
                 self.log_message("No open positions to close")
                 return True
 
-            success = True
+            # Market-close every position in batchOrders requests of 5
+            orders = []
             for position in positions:
-                contract = position['symbol']
-                size = position['positionAmt']
-                if float(size) != 0:
-                    if not self.close_position(contract=contract, size=size, price='0', tif='IOC'):
-                        success = False
+                size = float(position['positionAmt'])
+                if size != 0:
+                    orders.append({
+                        'symbol': position['symbol'],
+                        'side': 'SELL' if size > 0 else 'BUY',
+                        'type': 'MARKET',
+                        'quantity': self.format_quantity(position['symbol'], abs(size)),
+                        'reduceOnly': True
+                    })
+
+            def close_individually(**order):
+                # One failed close must not stop the others
+                try:
+                    return self.create_order(**order)
+                except Exception as e:
+                    self.log_message(f"Error closing position for {order['symbol']}: {e}")
+                    return None
+
+            success = True
+            for order, result in zip(orders, self.create_orders_batch(orders, fallback=close_individually)):
+                if result:
+                    self.log_message(f"Closed position for {order['symbol']}: {result}")
+                else:
+                    success = False
             return success
         except Exception as e:
             self.log_message(f"Error closing all positions: {e}")
@@ -300,9 +831,8 @@ class BinanceFuturesTrader:
         """Place stop loss and take profit orders."""
         try:
             # Get the actual position size from position info
-            positions = self.client.futures_position_information(symbol=contract)
-            position = next((pos for pos in positions if float(pos['positionAmt']) != 0), None)
-            if not position:
+            position = self.get_all_positions().get(contract)
+            if not position or float(position['positionAmt']) == 0:
                 raise ValueError(f"No open position found for {contract}")
             
             actual_size = abs(float(position['positionAmt']))
@@ -311,24 +841,14 @@ class BinanceFuturesTrader:
                 size = actual_size
 
             # Ensure we have a valid entry price
-            max_retries = 3
-            for attempt in range(max_retries):
-                if entry_price <= 0:
-                    self.log_message(f"Invalid entry price ({entry_price}), fetching current price... (Attempt {attempt + 1}/{max_retries})")
-                    try:
-                        entry_price = float(self.client.futures_symbol_ticker(symbol=contract)['price'])
-                        time.sleep(0.5)  # Small delay between retries
-                    except Exception as e:
-                        self.log_message(f"Error fetching price: {e}")
-                else:
-                    break
+            if entry_price <= 0:
+                self.log_message(f"Invalid entry price ({entry_price}), using the current mark price...")
+                entry_price = self.get_mark_price(contract)
             
             if entry_price <= 0:
-                raise ValueError(f"Could not get valid entry price after {max_retries} attempts")
+                raise ValueError(f"Could not get valid entry price for {contract}")
 
             # Store SL/TP values for this contract
-            if not hasattr(self, 'sl_tp_orders'):
-                self.sl_tp_orders = {}
             self.sl_tp_orders[contract] = {
                 'stop_loss': sl_percent,
                 'take_profit': tp_percent,
@@ -350,18 +870,17 @@ class BinanceFuturesTrader:
                 tp_price = entry_price * (1 - (tp_percent / 100))  # tp_percent is positive
 
             # Round prices to appropriate precision
-            symbol_info = self.client.futures_exchange_info()['symbols']
-            price_precision = 2  # default precision
-            quantity_precision = 3  # default precision
-            for s in symbol_info:
-                if s['symbol'] == contract:
-                    price_precision = s['pricePrecision']
-                    quantity_precision = s['quantityPrecision']
-                    break
-            
-            sl_price = round(sl_price, price_precision)
-            tp_price = round(tp_price, price_precision)
-            size = round(size, quantity_precision)
+            # Snap to the exchange's tick/step sizes with exact decimal arithmetic so the
+            # orders are never rejected for precision; fall back to rounding by digits
+            sl_quantized = self.quantize(contract, sl_price, size)
+            if sl_quantized:
+                sl_price, size = sl_quantized
+                tp_price = self.quantize(contract, tp_price, size)[0]
+            else:
+                price_precision, quantity_precision = self.get_precision(contract) or (2, 3)  # default precision
+                sl_price = round(sl_price, price_precision)
+                tp_price = round(tp_price, price_precision)
+                size = round(size, quantity_precision)
 
             # Log the calculations
             self.log_message(f"Calculated values for {contract}:")
@@ -370,32 +889,33 @@ class BinanceFuturesTrader:
 
             # Cancel any existing SL/TP orders
             open_orders = self.client.futures_get_open_orders(symbol=contract)
-            for order in open_orders:
-                if order['type'] in ['STOP_MARKET', 'TAKE_PROFIT_MARKET']:
-                    self.client.futures_cancel_order(
-                        symbol=contract,
-                        orderId=order['orderId']
-                    )
-
-            # Place stop loss order
-            sl_order = self.client.futures_create_order(
-                symbol=contract,
-                side='SELL' if direction == 'long' else 'BUY',
-                type='STOP_MARKET',
-                quantity=size,
-                stopPrice=sl_price,
-                reduceOnly=True
-            )
+            if not self.cancel_orders_batch(contract, [
+                order['orderId'] for order in open_orders
+                if order['type'] in ['STOP_MARKET', 'TAKE_PROFIT_MARKET']
+            ]):
+                # Placing new orders next to uncancelled ones would leave duplicate stops
+                self.log_message(f"Could not cancel existing SL/TP orders for {contract}")
+                return False
 
-            # Place take profit order
-            tp_order = self.client.futures_create_order(
-                symbol=contract,
-                side='SELL' if direction == 'long' else 'BUY',
-                type='TAKE_PROFIT_MARKET',
-                quantity=size,
-                stopPrice=tp_price,
-                reduceOnly=True
-            )
+            # Place stop loss and take profit orders in one request
+            sl_order, tp_order = self.create_orders_batch([
+                dict(
+                    symbol=contract,
+                    side='SELL' if direction == 'long' else 'BUY',
+                    type='STOP_MARKET',
+                    quantity=size,
+                    stopPrice=sl_price,
+                    reduceOnly=True
+                ),
+                dict(
+                    symbol=contract,
+                    side='SELL' if direction == 'long' else 'BUY',
+                    type='TAKE_PROFIT_MARKET',
+                    quantity=size,
+                    stopPrice=tp_price,
+                    reduceOnly=True
+                ),
+            ])
 
             self.log_message(f"Successfully placed SL/TP orders for {contract}:")
             self.log_message(f"SL order: {sl_order['orderId']}, price: {sl_price}, size: {size}")
@@ -404,40 +924,41 @@ class BinanceFuturesTrader:
         except Exception as e:
             self.log_message(f"Error placing SL/TP orders: {e}")
             # Clean up stored values on error
-            if hasattr(self, 'sl_tp_orders') and contract in self.sl_tp_orders:
-                del self.sl_tp_orders[contract]
+            self.sl_tp_orders.pop(contract, None)
             return False
 
     def cleanup(self):
         """Clean up before shutdown by closing positions and canceling open orders."""
         self.log_message("Cleaning up before shutdown...")
+        self._stop_event.set()
         try:
             self.close_all_positions()
             orders = self.client.futures_get_open_orders()
-            for order in orders:
-                self.client.futures_cancel_order(symbol=order['symbol'], orderId=order['orderId'])
-                self.log_message(f"Canceled order {order['orderId']} for {order['symbol']}")
+            symbols = {order['symbol'] for order in orders}
+            # One allOpenOrders request per symbol, all symbols at once
+            self._invalidate_positions()
+            for symbol, error in zip(symbols, self._pool.map(self._cancel_all_open_orders, symbols)):
+                if error:
+                    self.log_message(f"Error cancelling open orders for {symbol}: {error}")
         except Exception as e:
             self.log_message(f"Error during cleanup: {e}")
 
+    def _cancel_all_open_orders(self, symbol):
+        """Cancel every open order on symbol; returns the error, or None on success."""
+        try:
+            self.client.futures_cancel_all_open_orders(symbol=symbol)
+            return None
+        except Exception as e:
+            return e
+
     def calculate_rsi(self, klines, period=5):
         """Calculate RSI for given klines data."""
         try:
-            closes = [float(k[4]) for k in klines]  # Close prices
-            deltas = [closes[i] - closes[i-1] for i in range(1, len(closes))]
-            
-            gains = []
-            losses = []
-            for delta in deltas:
-                if delta > 0:
-                    gains.append(delta)
-                    losses.append(0)
-                else:
-                    gains.append(0)
-                    losses.append(abs(delta))
+            closes = np.fromiter((float(k[4]) for k in klines), dtype=np.float64, count=len(klines))  # Close prices
+            deltas = np.diff(closes)[-period:]
             
-            avg_gain = sum(gains[-period:]) / period
-            avg_loss = sum(losses[-period:]) / period
+            avg_gain = np.where(deltas > 0, deltas, 0.0).sum() / period
+            avg_loss = np.where(deltas < 0, -deltas, 0.0).sum() / period
             
             if avg_loss == 0:
                 return 100
@@ -445,7 +966,7 @@ class BinanceFuturesTrader:
             rs = avg_gain / avg_loss
             rsi = 100 - (100 / (1 + rs))
             
-            return rsi
+            return float(rsi)
         except Exception as e:
             self.log_message(f"Error calculating RSI: {e}")
             return None
@@ -463,6 +984,90 @@ class BinanceFuturesTrader:
             self.log_message(f"Error fetching Coinglass flow data: {e}")
             return None
 
+    def handle_kline(self, msg):
+        """Record a kline from a (continuous) futures kline stream message."""
+        data = msg.get('data', msg)
+        k = data.get('k')
+        if not k:
+            return
+        symbol = data.get('ps') or data.get('s') or k.get('s')
+        row = [k['t'], k['o'], k['h'], k['l'], k['c']]
+        if not k.get('x'):
+            self._forming_klines[(symbol, k['i'])] = (row, time.time())
+            return
+        rows = self._stream_klines.setdefault((symbol, k['i']), deque(maxlen=100))
+        if rows and rows[-1][0] == k['t']:
+            rows[-1] = row
+        else:
+            rows.append(row)
+            self._update_rsi_state((symbol, k['i']), k['t'], k['T'] + 1 - k['t'], float(k['c']))
+
+    def _update_rsi_state(self, key, open_time, interval_ms, close):
+        """Slide the rolling gain/loss window forward by one closed bar."""
+        period = self.stream_rsi_period
+        state = self._rsi_state.get(key)
+        if state is None or open_time - state['open_time'] != interval_ms:
+            # First bar, or bars were missed: restart the window from this close
+            self._rsi_state[key] = {
+                'gains': deque(maxlen=period), 'losses': deque(maxlen=period),
+                'gain_sum': 0.0, 'loss_sum': 0.0, 'close': close, 'open_time': open_time,
+                'interval_ms': interval_ms,
+            }
+            return
+        delta = close - state['close']
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if len(state['gains']) == period:
+            state['gain_sum'] -= state['gains'][0]
+            state['loss_sum'] -= state['losses'][0]
+        state['gains'].append(gain)
+        state['losses'].append(loss)
+        state['gain_sum'] += gain
+        state['loss_sum'] += loss
+        state['close'] = close
+        state['open_time'] = open_time
+
+    def get_stream_rsi(self, symbol, interval, period, forming):
+        """Return calculate_rsi's value for the streamed closes ending with the forming row.
+
+        None if the window is not full or does not end right before forming.
+        """
+        state = self._rsi_state.get((symbol, interval))
+        if period != self.stream_rsi_period or not state or len(state['gains']) < period:
+            return None
+        if forming[0] - state['open_time'] != state['interval_ms']:
+            return None
+        # The oldest closed delta drops out and the forming bar's delta comes in
+        delta = float(forming[4]) - state['close']
+        gain_sum = state['gain_sum'] - state['gains'][0] + (delta if delta > 0 else 0.0)
+        loss_sum = state['loss_sum'] - state['losses'][0] + (-delta if delta < 0 else 0.0)
+        avg_gain = max(gain_sum, 0.0) / period
+        avg_loss = max(loss_sum, 0.0) / period
+        # Rounding in the running sums can leave a tiny residue where calculate_rsi sees 0
+        if avg_loss <= 1e-12:
+            return 100
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def get_stream_klines(self, symbol, interval_ms, interval, count):
+        """Return the last count streamed klines, or None if they are stale or have gaps.
+
+        Like futures_klines, the last row is the bar still forming.
+        """
+        rows = self._stream_klines.get((symbol, interval))
+        forming = self._forming_klines.get((symbol, interval))
+        if not rows or len(rows) < count - 1 or forming is None:
+            return None
+        forming, received_at = forming
+        # The forming row must be the current bar and recently updated, with no
+        # missed bars before it
+        now = time.time()
+        if now - received_at > 10 or now * 1000 - forming[0] >= interval_ms:
+            return None
+        rows = list(rows)[len(rows) - (count - 1):] + [forming]
+        if any(b[0] - a[0] != interval_ms for a, b in zip(rows, rows[1:])):
+            return None
+        return rows
+
     def check_strategy_conditions(self, contract="BTCUSDT"):
         """Check if strategy conditions are met for trading."""
         try:
@@ -473,19 +1078,25 @@ class BinanceFuturesTrader:
             flow_threshold_5m = 100000
             flow_threshold_1h = 500000
             
-            # Get recent klines for RSI calculation
-            klines = self.client.futures_klines(
-                symbol=contract,
-                interval='5m',
-                limit=rsi_period + 1
-            )
+            # Get recent klines for RSI calculation, the forming bar last: from the
+            # kline stream when it is current, else REST
+            klines = self.get_stream_klines(contract, 300000, '5m', rsi_period + 1)
+            from_stream = klines is not None
+            if klines is None:
+                klines = self.client.futures_klines(
+                    symbol=contract,
+                    interval='5m',
+                    limit=rsi_period + 1
+                )
             
             if not klines or len(klines) < rsi_period + 1:
                 self.log_message("Not enough klines data for RSI calculation")
                 return None
             
-            # Calculate RSI
-            rsi = self.calculate_rsi(klines, rsi_period)
+            # Calculate RSI, from the rolling stream state when the stream supplied the bars
+            rsi = self.get_stream_rsi(contract, '5m', rsi_period, klines[-1]) if from_stream else None
+            if rsi is None:
+                rsi = self.calculate_rsi(klines, rsi_period)
             if rsi is None:
                 return None
             
@@ -539,10 +1150,7 @@ class BinanceFuturesTrader:
         """Execute the trading strategy."""
         try:
             # Check if we already have an open position
-            positions = self.get_open_positions()
-            has_position = any(pos['symbol'] == contract and float(pos['positionAmt']) != 0 for pos in positions)
-            
-            if has_position:
+            if self.get_position(contract):
                 self.log_message(f"Already have an open position for {contract}")
                 return False
             
@@ -567,8 +1175,7 @@ class BinanceFuturesTrader:
                 return False
             
             # Get the entry price from the position
-            positions = self.get_open_positions()
-            position = next((pos for pos in positions if pos['symbol'] == contract), None)
+            position = self.get_position(contract)
             if not position:
                 self.log_message(f"Failed to get position info for {contract}")
                 return False
@@ -1,24 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+# Selenium, fake_useragent and webdriver_manager are imported inside the functions
+# that drive the browser, so importing this module (e.g. for save_data) stays cheap
+from collections import deque
 import csv
 import os
-import schedule
+import shutil
+import signal
+import subprocess
+import tempfile
 import time
 import logging
 import re
-import json
 import random
 from datetime import datetime, timedelta
-from fake_useragent import UserAgent
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 
 # Configure logging
 logging.basicConfig(
@@ -30,17 +23,76 @@ logging.basicConfig(
     ]
 )
 
-# Initialize fetch history
-fetch_history = []
+# Initialize fetch history; only the latest entries are ever inspected
+fetch_history = deque(maxlen=16)
+
+# Month abbreviations for CSV timestamps (what %b gives in the C locale)
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Seconds between scheduled fetches
+FETCH_INTERVAL = 300
+
+# A currency amount such as "$1.2M" or "-$350K": sign, number and unit
+_AMOUNT_RE = re.compile(r'(-?)\$(.*?)([TBMK]?)')
+_UNIT_MULTIPLIERS = {'T': 1_000_000_000_000, 'B': 1_000_000_000, 'M': 1_000_000, 'K': 1_000, '': 1}
+
+# The BTC table row, once its currency values are filled in
+BTC_ROW_XPATH = "//tr[contains(., 'BTC')][.//td[contains(., '$')]]"
+
+# CSV output, opened once and line-buffered so each row is on disk once written
+_csv_file = None
+_csv_writer = None
+
+# Requests Chrome is told to drop (Network.setBlockedURLs wildcard patterns)
+BLOCKED_URL_PATTERNS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*facebook.net*',
+    '*hotjar.com*',
+    '*sentry.io*',
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg',
+    '*.woff', '*.woff2', '*.ttf',
+    '*.mp4',
+]
+
+# UserAgent dataset and chromedriver path, loaded on the first driver setup and
+# reused when the driver is restarted
+_user_agents = None
+_chromedriver_path = None
+
+# Chrome session shared by every scheduled fetch; started on first use
+_driver = None
+# Fetches served by the current driver. Every LEAK_CLEANUP_EVERY fetches its caches
+# are dropped and garbage collected; after DRIVER_RECYCLE_EVERY it is restarted
+_driver_fetches = 0
+LEAK_CLEANUP_EVERY = 50
+DRIVER_RECYCLE_EVERY = 500
 
 def get_random_delay(min_seconds=1, max_seconds=3):
     """Generate a random delay between min_seconds and max_seconds"""
     return random.uniform(min_seconds, max_seconds)
 
+def get_backoff_delay(attempt, base=1.0, cap=30, jitter=0.5):
+    """Exponential backoff for retry number attempt (1 for the first retry), randomized by up to jitter and capped at cap seconds"""
+    return min(cap, base * (2 ** attempt) * (1 + random.uniform(0, jitter)))
+
 def setup_driver():
     """Set up Chrome driver with enhanced anti-detection measures"""
+    from fake_useragent import UserAgent
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+    global _user_agents, _chromedriver_path
+    driver = None
+    # Chrome gets its own profile directory, removed again when the driver quits
+    profile_dir = tempfile.mkdtemp(prefix='chrome-crawler-')
     try:
         chrome_options = Options()
+        chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+        chrome_options.add_argument('--disable-breakpad')
         
         # Proper headless mode configuration
         chrome_options.add_argument('--headless=new')
@@ -52,9 +104,18 @@ def setup_driver():
         chrome_options.add_argument('--disable-notifications')
         chrome_options.add_argument('--disable-popup-blocking')
         
+        # Only the table text is read, so don't download or decode images. Stylesheets
+        # stay on: WebElement.text depends on which elements CSS makes visible
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+        
         # Add random user agent
-        ua = UserAgent()
-        user_agent = ua.random
+        if _user_agents is None:
+            _user_agents = UserAgent()
+        user_agent = _user_agents.random
         chrome_options.add_argument(f'user-agent={user_agent}')
         logging.info(f"Using User-Agent: {user_agent}")
         
@@ -72,8 +133,10 @@ def setup_driver():
         chrome_options.add_argument('--mute-audio')
         
         try:
-            # Try to use ChromeDriverManager
-            service = Service(ChromeDriverManager().install())
+            # Try to use ChromeDriverManager; it only has to resolve the driver once
+            if _chromedriver_path is None:
+                _chromedriver_path = ChromeDriverManager().install()
+            service = Service(_chromedriver_path, log_output=subprocess.DEVNULL)
             driver = webdriver.Chrome(service=service, options=chrome_options)
         except Exception as e:
             logging.error(f"Error using ChromeDriverManager: {e}")
@@ -81,7 +144,7 @@ def setup_driver():
             local_driver_path = os.path.join(os.path.dirname(__file__), 'chromedriver.exe')
             if os.path.exists(local_driver_path):
                 logging.info("Using local chromedriver")
-                service = Service(local_driver_path)
+                service = Service(local_driver_path, log_output=subprocess.DEVNULL)
                 driver = webdriver.Chrome(service=service, options=chrome_options)
             else:
                 raise Exception("No valid chromedriver found")
@@ -101,13 +164,75 @@ def setup_driver():
             '''
         })
         
+        # Skip trackers, ads and media the crawler never reads; fewer requests let the
+        # page finish loading sooner
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logging.warning(f"Could not set blocked URLs: {e}")
+        
+        driver.profile_dir = profile_dir
         logging.info("Chrome driver setup completed successfully in headless mode")
         return driver
     except Exception as e:
         logging.error(f"Failed to setup Chrome driver: {e}")
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        shutil.rmtree(profile_dir, ignore_errors=True)
         raise
 
+def get_driver():
+    """Return the shared Chrome driver, starting it if there is none"""
+    global _driver
+    if _driver is None:
+        _driver = setup_driver()
+    return _driver
+
+def quit_driver():
+    """Quit the shared Chrome driver; the next get_driver() starts a new one"""
+    global _driver, _driver_fetches
+    _driver_fetches = 0
+    if _driver is None:
+        return
+    try:
+        _driver.quit()
+        logging.info("Browser closed successfully")
+    except Exception as e:
+        logging.warning(f"Error closing browser: {str(e)}")
+        # Make sure chromedriver and its pipes don't outlive a failed quit
+        try:
+            _driver.service.stop()
+        except Exception as e:
+            logging.warning(f"Error stopping chromedriver: {str(e)}")
+    shutil.rmtree(_driver.profile_dir, ignore_errors=True)
+    _driver = None
+
+def maintain_driver():
+    """Count a fetch on the shared driver and bound its memory use"""
+    global _driver_fetches
+    if _driver is None:
+        return
+    _driver_fetches += 1
+    if _driver_fetches >= DRIVER_RECYCLE_EVERY:
+        logging.info(f"Restarting browser after {_driver_fetches} fetches")
+        quit_driver()
+    elif _driver_fetches % LEAK_CLEANUP_EVERY == 0:
+        try:
+            # Terminates workers and drops non-essential caches, then runs GC
+            _driver.execute_cdp_cmd('Memory.prepareForLeakDetection', {})
+            _driver.execute_cdp_cmd('HeapProfiler.collectGarbage', {})
+            logging.info("Browser caches cleared")
+        except Exception as e:
+            logging.warning(f"Error clearing browser caches: {str(e)}")
+
 def wait_and_find_element(driver, by, selector, timeout=10, retries=3):
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
     for attempt in range(retries):
         try:
             element = WebDriverWait(driver, timeout).until(
@@ -125,6 +250,10 @@ def wait_and_find_element(driver, by, selector, timeout=10, retries=3):
             logging.error(f"Error finding element: {str(e)}")
             raise
 
+def format_timestamp(dt):
+    """Format dt as "DD Mon YYYY, HH:MM" with English month names, independent of the locale"""
+    return f"{dt.day:02d} {_MONTHS[dt.month - 1]} {dt.year}, {dt.hour:02d}:{dt.minute:02d}"
+
 def adjust_timestamp(fetch_timestamp, refresh_interval=5):
     """
     根据刷新间隔调整时间戳，使其对齐到最近的 5 分钟时间点
@@ -139,7 +268,7 @@ def adjust_timestamp(fetch_timestamp, refresh_interval=5):
     # 如果分钟数被调整到 60，则需要进位到下一小时
     if adjusted_minutes == 60:
         adjusted_time = adjusted_time.replace(minute=0) + timedelta(hours=1)
-    return adjusted_time.strftime('%d %b %Y, %H:%M')
+    return format_timestamp(adjusted_time)
 
 def infer_refresh_time(fetch_history):
     """
@@ -156,55 +285,38 @@ def infer_refresh_time(fetch_history):
     # 计算时间差（分钟）
     delta1 = (t2 - t1).total_seconds() / 60
     delta2 = (t3 - t2).total_seconds() / 60
+    # 两次间隔都在 5 分钟 ±30 秒内时直接返回（常见情况）
+    if abs(delta1 - 5) <= 0.5 and abs(delta2 - 5) <= 0.5:
+        return 5
     # 推断刷新间隔（取平均值并四舍五入到最近的整数）
     avg_delta = (delta1 + delta2) / 2
     return round(avg_delta / 5) * 5  # 假设刷新间隔是 5 分钟的倍数
 
 def fetch_data():
     """Fetch data with enhanced error handling and retry logic"""
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+    from selenium.webdriver.common.by import By
     logging.info("Starting data fetch...")
-    driver = None
     max_retries = 3
     retry_count = 0
     
     while retry_count < max_retries:
         try:
-            if driver:
-                driver.quit()
-            driver = setup_driver()
+            # Reuse the browser from the previous fetch instead of starting Chrome each time
+            driver = get_driver()
             url = "https://www.coinglass.com/spot-inflow-outflow"
             driver.get(url)
             logging.info("Page loaded, waiting for data...")
             
-            # Add random delay between 3-7 seconds
-            time.sleep(random.uniform(3, 7))
-            
-            # Try different methods to find the BTC data
-            selectors = [
-                "//tr[contains(., 'BTC')]",
-                "//div[contains(@class, 'coin-row') and contains(., 'BTC')]",
-                "//table//tr[.//td[contains(text(), 'BTC')]]",
-                "//div[contains(@class, 'MuiTableRow-root') and contains(., 'BTC')]",
-                "//div[contains(text(), 'BTC')]//ancestor::tr",
-                "//div[contains(@class, 'table')]//tr[contains(., 'BTC')]"
-            ]
-            
-            btc_row = None
-            for selector in selectors:
-                try:
-                    btc_row = wait_and_find_element(driver, By.XPATH, selector, timeout=5)
-                    if btc_row:
-                        logging.info(f"Found BTC data using selector: {selector}")
-                        break
-                except Exception as e:
-                    logging.debug(f"Selector failed: {selector}, Error: {e}")
-                    continue
-            
-            if not btc_row:
-                raise NoSuchElementException("Could not find BTC data with any selector")
+            # Wait until the BTC row has its values rendered, rather than sleeping a
+            # fixed time and then trying selectors one by one
+            try:
+                btc_row = wait_and_find_element(driver, By.XPATH, BTC_ROW_XPATH, timeout=15, retries=1)
+            except TimeoutException:
+                raise NoSuchElementException("BTC data did not appear on the page")
             
             # Extract timestamp
-            timestamp = datetime.now().strftime("%d %b %Y, %H:%M")
+            timestamp = format_timestamp(datetime.now())
             
             # Extract and validate netflow data
             netflow_data = btc_row.text.strip()
@@ -229,23 +341,29 @@ def fetch_data():
         except Exception as e:
             retry_count += 1
             logging.error(f"Attempt {retry_count}/{max_retries} failed: {str(e)}")
+            # The session may be broken; retry with a fresh browser
+            quit_driver()
             if retry_count < max_retries:
-                time.sleep(10)  # Wait before retry
+                time.sleep(get_backoff_delay(retry_count))  # Wait before retry
             else:
                 logging.error("All retry attempts failed")
                 return None
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                    logging.info("Browser closed successfully")
-                except Exception as e:
-                    logging.warning(f"Error closing browser: {str(e)}")
+
+def get_csv_writer(csv_file='btc_spot_netflow.csv'):
+    """Return the CSV writer, opening the file and writing the header on first use"""
+    global _csv_file, _csv_writer
+    if _csv_writer is None:
+        _csv_file = open(csv_file, 'a', newline='', encoding='utf-8', buffering=1)
+        _csv_writer = csv.writer(_csv_file)
+        # Create file with header if it is new
+        if _csv_file.tell() == 0:
+            header = ['Timestamp', '5m', '15m', '30m', '1h', '2h', '4h', 
+                     '6h', '8h', '12h', '24h', '7d', '15d', '30d', 'Market Cap']
+            _csv_writer.writerow(header)
+    return _csv_writer
 
 def save_data(timestamp, netflow_data):
-    """Save data to CSV file with proper formatting"""
-    csv_file = 'btc_spot_netflow.csv'
-    
+    """Save data to CSV file with proper formatting; returns True if a row was written"""
     try:
         # Parse the netflow data
         data_parts = netflow_data.split()
@@ -253,86 +371,61 @@ def save_data(timestamp, netflow_data):
         market_cap = None
         
         # Extract values, looking for currency amounts
-        for part in data_parts:
-            if part.startswith('$') or part.startswith('-$'):
-                # Remove the '$' and convert to numeric value
-                value = part.replace('$', '')
-                multiplier = 1
-                
-                # Handle different units (T, B, M, K)
-                if value.endswith('T'):
-                    multiplier = 1_000_000_000_000
-                    value = value[:-1]
-                elif value.endswith('B'):
-                    multiplier = 1_000_000_000
-                    value = value[:-1]
-                elif value.endswith('M'):
-                    multiplier = 1_000_000
-                    value = value[:-1]
-                elif value.endswith('K'):
-                    multiplier = 1_000
-                    value = value[:-1]
-                
-                # Convert to numeric value
+        for i, part in enumerate(data_parts):
+            amount = _AMOUNT_RE.fullmatch(part)
+            if amount:
+                # Convert to numeric value, scaled by the unit (T, B, M, K)
+                sign, number, unit = amount.groups()
                 try:
-                    numeric_value = float(value) * multiplier
-                    values.append(str(numeric_value))
+                    values.append(str(float(sign + number) * _UNIT_MULTIPLIERS[unit]))
                 except ValueError as e:
-                    logging.warning(f"Could not convert value {value}: {str(e)}")
+                    logging.warning(f"Could not convert value {sign + number}: {str(e)}")
                     values.append(part)  # Keep original value if conversion fails
             
-            elif part.startswith('Market') and len(data_parts) > data_parts.index(part) + 2:
+            elif part.startswith('Market') and len(data_parts) > i + 2:
                 # Extract market cap
-                cap_value = data_parts[data_parts.index(part) + 2]
+                cap_value = data_parts[i + 2]
                 if cap_value.startswith('$'):
                     market_cap = cap_value
         
         if not values:
             logging.error("No valid netflow values found in the data")
-            return
+            return False
             
-        # Create file with header if it doesn't exist
-        if not os.path.exists(csv_file):
-            with open(csv_file, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                header = ['Timestamp', '5m', '15m', '30m', '1h', '2h', '4h', 
-                         '6h', '8h', '12h', '24h', '7d', '15d', '30d', 'Market Cap']
-                writer.writerow(header)
-        
         # Append the data
-        with open(csv_file, 'a', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            row = [timestamp] + values
-            if market_cap:
-                row.append(market_cap)
-            writer.writerow(row)
-            logging.info(f"Data saved to CSV: {timestamp}, {len(values)} values")
+        row = [timestamp] + values
+        if market_cap:
+            row.append(market_cap)
+        get_csv_writer().writerow(row)
+        logging.info(f"Data saved to CSV: {timestamp}, {len(values)} values")
+        return True
             
     except Exception as e:
         logging.error(f"Error saving data to CSV: {str(e)}")
         logging.error(f"Raw netflow data: {netflow_data}")
+        return False
 
 def fetch_and_store_data():
-    """Fetch and store data with proper error handling"""
+    """Fetch and store data with proper error handling; returns True if data was saved"""
     logging.info("Scheduled task triggered")
     try:
         result = fetch_data()
+        maintain_driver()
         if result:
             timestamp, netflow = result['timestamp'], result['data']
-            save_data(timestamp, netflow)
-            logging.info(f"Data saved successfully: {timestamp}")
+            if save_data(timestamp, netflow):
+                logging.info(f"Data saved successfully: {timestamp}")
+                return True
         else:
             logging.warning("No valid data received, retrying in next cycle")
     except Exception as e:
         logging.error(f"Error in fetch_and_store_data: {str(e)}")
+    return False
 
 def main():
     """Main function with improved error handling and scheduling"""
     logging.info("Starting crawler main function")
     
-    # Schedule the task to run every 5 minutes
-    schedule.every(5).minutes.do(fetch_and_store_data)
-    
     # Initial run
     retry_count = 0
     max_retries = 3
@@ -348,11 +441,11 @@ def main():
             else:
                 retry_count += 1
                 logging.warning(f"Initial fetch attempt {retry_count} failed")
-                time.sleep(10)
+                time.sleep(get_backoff_delay(retry_count))
         except Exception as e:
             retry_count += 1
             logging.error(f"Error during initial fetch attempt {retry_count}: {str(e)}")
-            time.sleep(10)
+            time.sleep(get_backoff_delay(retry_count))
     
     if not initial_success:
         logging.error("Failed to fetch initial data after maximum retries")
@@ -365,8 +458,11 @@ def main():
     
     while True:
         try:
-            # Run pending tasks
-            schedule.run_pending()
+            # Sleep until the next 5 minute boundary (the grid adjust_timestamp uses),
+            # then fetch, instead of polling a scheduler every second
+            next_run = (time.time() // FETCH_INTERVAL + 1) * FETCH_INTERVAL
+            time.sleep(max(0, next_run - time.time()))
+            fetch_and_store_data()
             
             # Check if the data file exists and is being updated
             csv_file = os.path.join(os.path.dirname(__file__), 'btc_spot_netflow.csv')
@@ -379,8 +475,6 @@ def main():
                     if result:
                         consecutive_errors = 0
             
-            # Sleep for a short time
-            time.sleep(1)
             consecutive_errors = 0  # Reset error counter on success
             
         except Exception as e:
@@ -402,6 +496,9 @@ def main():
 
 if __name__ == "__main__":
     logging.info("Crawler starting up")
+    # The bot stops the crawler with SIGTERM; exit through KeyboardInterrupt so the
+    # browser is quit and its profile removed below
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     while True:  # Outer loop for automatic restart
         try:
             main()
@@ -413,4 +510,5 @@ if __name__ == "__main__":
         except Exception as e:
             logging.error(f"Fatal error: {str(e)}")
             logging.info("Restarting in 30 seconds...")
-            time.sleep(30)
\ No newline at end of file
+            time.sleep(30)
+    quit_driver()
\ No newline at end of file